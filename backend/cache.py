@@ -0,0 +1,47 @@
+from typing import Optional
+import redis.asyncio as redis
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# All response-cache keys live under this prefix so they can be cleared together
+CACHE_PREFIX = "sniper:"
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Get the shared async Redis client"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+async def get_cached(key: str) -> Optional[bytes]:
+    """Return the cached payload for key, or None on a miss or Redis error"""
+    try:
+        return await get_redis().get(CACHE_PREFIX + key)
+    except Exception as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+
+
+async def set_cached(key: str, payload: bytes, ttl: int) -> None:
+    """Store payload under key for ttl seconds, ignoring Redis errors"""
+    try:
+        await get_redis().set(CACHE_PREFIX + key, payload, ex=ttl)
+    except Exception as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+
+async def invalidate(prefix: str = "") -> None:
+    """Delete every cached entry whose key starts with prefix"""
+    try:
+        client = get_redis()
+        keys = [key async for key in client.scan_iter(match=f"{CACHE_PREFIX}{prefix}*")]
+        if keys:
+            await client.delete(*keys)
+    except Exception as e:
+        logger.warning(f"Cache invalidation failed for {prefix!r}: {e}")
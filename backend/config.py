@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from functools import lru_cache
 from typing import Optional
 import os
 
@@ -11,13 +12,24 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "password"
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE: int = 1800  # 30 minutes
+    DB_STATEMENT_CACHE_SIZE: int = 1024
+    SQL_SLOW_QUERY_MS: int = 500
+    SQL_LOG_SAMPLE_RATE: int = 100  # log 1 in N statements at DEBUG; 0 disables
     
     # API Keys
     ALPHA_VANTAGE_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
+    OPENAI_MODEL: str = "gpt-3.5-turbo"
     
     # Redis (for caching and Celery)
     REDIS_URL: str = "redis://localhost:6379"
+    CACHE_TTL_LIST: int = 60  # seconds
+    CACHE_TTL_STATS: int = 300  # 5 minutes
+    CACHE_TTL_TRENDS: int = 60  # seconds
+    CACHE_TTL_ALPHA_VANTAGE: int = 120  # seconds
     
     # App Settings
     APP_NAME: str = "Sniper News Intelligence"
@@ -26,15 +38,39 @@ class Settings(BaseSettings):
     
     # Sentiment Analysis
     SENTIMENT_BATCH_SIZE: int = 10
+    REPROCESS_CONCURRENCY: int = 8
+    FINBERT_BATCH_WAIT_MS: int = 20  # How long queued single-text requests wait to share a forward pass
     FINBERT_MODEL_NAME: str = "ProsusAI/finbert"
+    PRELOAD_SENTIMENT_ENGINE: bool = True
+    TOKENIZER_CACHE_SIZE: int = 4096
+    FINBERT_RESULT_CACHE_SIZE: int = 4096
+    FINBERT_PRECISION: str = "auto"  # auto (bf16/fp16 on CUDA, int8 on CPU), bf16, fp16, int8 or fp32
+    FINBERT_NUM_THREADS: int = 0  # Intra-op CPU threads per process; 0 keeps torch's default (all cores)
+    FINBERT_COMPILE: bool = False  # torch.compile the model at startup; slower boot, faster forward passes
+    FINBERT_COMPILE_MODE: str = "default"  # torch.compile mode: default, reduce-overhead or max-autotune-no-cudagraphs
+    FINBERT_CUDA_GRAPHS: bool = False  # Replay recorded CUDA graphs for bucketed batch shapes (CUDA only, not with FINBERT_COMPILE)
+    EMBEDDING_CACHE_TTL: int = 86400  # 24 hours
+    OPENAI_CACHE_TTL: int = 7 * 86400  # 7 days
+    OPENAI_LOCAL_CACHE_SIZE: int = 1024  # In-process LRU in front of the Redis OpenAI cache
+    OPENAI_BREAKER_THRESHOLD: int = 5  # Consecutive OpenAI failures before calls are skipped
+    OPENAI_BREAKER_COOLDOWN: float = 30.0  # Seconds to skip OpenAI calls once the breaker opens
+    SENTIMENT_CACHE_TTL: int = 86400  # 24 hours; worker-shared results for republished summaries
     
     # News Processing
     NEWS_UPDATE_INTERVAL: int = 300  # 5 minutes
     MAX_ARTICLES_PER_REQUEST: int = 100
+    HTTP_MAX_CONNECTIONS: int = 64
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 32
     
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once; later calls (and FastAPI Depends) reuse the parsed instance"""
+    return Settings()
+
+
+settings = get_settings()
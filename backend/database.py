@@ -1,32 +1,94 @@
-from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy import create_engine, MetaData, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from pgvector.sqlalchemy import Vector
-from config import settings
+from config import get_settings
+import itertools
 import logging
+import orjson
+import time
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
 # Database URL for async operations
 ASYNC_DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
+# How far back the news_hourly refresh policy re-materializes; /stats reads raw rows beyond it
+NEWS_HOURLY_REFRESH_HOURS = 72
+
+# Serializes the URL lookup + insert of overlapping ingests (API and Celery); released when the transaction ends
+INGEST_LOCK_QUERY = text("SELECT pg_advisory_xact_lock(hashtext('news_articles_ingest'))")
+
+
+def _orjson_serializer(obj) -> str:
+    """JSON/JSONB bind serializer; orjson emits bytes, the drivers expect str"""
+    return orjson.dumps(obj).decode()
+
+
 # Create async engine
 async_engine = create_async_engine(
     ASYNC_DATABASE_URL,
-    echo=settings.DEBUG,
+    echo=False,
     pool_pre_ping=True,
-    pool_recycle=300,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    # Reuse the most recently returned connection so surplus ones idle out
+    pool_use_lifo=True,
+    # raw_data / keywords are JSONB; serialize them with orjson instead of stdlib json
+    json_serializer=_orjson_serializer,
+    json_deserializer=orjson.loads,
+    connect_args={
+        # Server-side keepalives so idle pooled connections aren't silently dropped
+        "server_settings": {
+            "tcp_keepalives_idle": "30",
+            "tcp_keepalives_interval": "10",
+            "tcp_keepalives_count": "3",
+            "jit": "off",
+        },
+        # The routers issue the same parameterized statements repeatedly
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    },
 )
 
 # Create sync engine for migrations
 sync_engine = create_engine(
     settings.DATABASE_URL,
-    echo=settings.DEBUG,
+    echo=False,
     pool_pre_ping=True,
-    pool_recycle=300,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_use_lifo=True,
+    json_serializer=_orjson_serializer,
+    json_deserializer=orjson.loads,
 )
 
+
+def _attach_query_logging(engine):
+    """Log slow statements plus a 1-in-N sample, instead of echoing every statement"""
+    counter = itertools.count(1)
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+        if elapsed_ms >= settings.SQL_SLOW_QUERY_MS:
+            logger.warning("Slow query (%.1f ms): %s", elapsed_ms, statement)
+        elif settings.SQL_LOG_SAMPLE_RATE and next(counter) % settings.SQL_LOG_SAMPLE_RATE == 0:
+            logger.debug("Sampled query (%.1f ms): %s", elapsed_ms, statement)
+
+
+_attach_query_logging(async_engine.sync_engine)
+_attach_query_logging(sync_engine)
+
 # Session factories
 AsyncSessionLocal = async_sessionmaker(
     async_engine, class_=AsyncSession, expire_on_commit=False
@@ -46,6 +108,7 @@ async def init_db():
         # Enable required extensions
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
@@ -53,16 +116,15 @@ async def init_db():
         # Create hypertable for time-series data (now that table structure is fixed)
         await conn.execute(text("""
             SELECT create_hypertable('news_articles', 'published_at', 
+                                   chunk_time_interval => INTERVAL '1 day',
                                    if_not_exists => TRUE, 
                                    migrate_data => TRUE)
         """))
         
-        # Create indexes for vector search
-        await conn.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_news_sentiment_vector 
-            ON news_articles USING ivfflat (sentiment_vector vector_cosine_ops)
-            WITH (lists = 100)
-        """))
+        # No ANN index on sentiment_vector: similarity search only re-ranks the few text-search
+        # candidates by exact distance, so an index would just slow every ingest and rescore
+        await conn.execute(text("DROP INDEX IF EXISTS idx_news_sentiment_vector_hnsw"))
+        await conn.execute(text("DROP INDEX IF EXISTS idx_news_sentiment_vector"))
         
         # Create indexes for time-based queries
         await conn.execute(text("""
@@ -74,6 +136,73 @@ async def init_db():
             CREATE INDEX IF NOT EXISTS idx_news_ticker 
             ON news_articles (ticker_symbol)
         """))
+        
+        # Partial index for the recent/trends listings, which only return processed rows
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_news_processed_published_at 
+            ON news_articles (published_at DESC) WHERE is_processed
+        """))
+        
+        # Partial index for the daily archive sweep
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_news_unarchived_published_at 
+            ON news_articles (published_at) WHERE is_archived = FALSE
+        """))
+        
+        # Partial index for the /reprocess/binary scan
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_news_binary_sentiment 
+            ON news_articles (id) WHERE sentiment_score IN (-0.5, 0.5)
+        """))
+        
+        # Covering index so per-ticker window scans can be index-only
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_news_ticker_published_at 
+            ON news_articles (ticker_symbol, published_at DESC) INCLUDE (sentiment_score)
+        """))
+        
+        # Full-text search column and index for /search/similar
+        await conn.execute(text("""
+            ALTER TABLE news_articles ADD COLUMN IF NOT EXISTS tsv tsvector
+            GENERATED ALWAYS AS (
+                to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))
+            ) STORED
+        """))
+        
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_news_tsv 
+            ON news_articles USING GIN (tsv)
+        """))
+        
+        # Trigram index for fuzzy title matching when full-text search finds nothing
+        await conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_news_title_trgm 
+            ON news_articles USING GIN (title gin_trgm_ops)
+        """))
+        
+        # Hourly per-ticker rollup so /stats doesn't rescan raw rows
+        await conn.execute(text("""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS news_hourly
+            WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+            SELECT
+                time_bucket('1 hour', published_at) AS bucket,
+                ticker_symbol,
+                count(*) AS article_count,
+                count(*) FILTER (WHERE is_processed) AS processed_count,
+                count(sentiment_score) AS scored_count,
+                sum(sentiment_score) AS sentiment_sum
+            FROM news_articles
+            GROUP BY bucket, ticker_symbol
+            WITH NO DATA
+        """))
+        
+        await conn.execute(text(f"""
+            SELECT add_continuous_aggregate_policy('news_hourly',
+                start_offset => INTERVAL '{NEWS_HOURLY_REFRESH_HOURS} hours',
+                end_offset => INTERVAL '1 hour',
+                schedule_interval => INTERVAL '5 minutes',
+                if_not_exists => TRUE)
+        """))
 
 
 async def get_async_db():
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 import uvicorn
@@ -9,6 +9,7 @@ from config import settings
 from database import init_db
 from routers import news
 from sentiment.sentiment_engine import sentiment_engine
+from services.news_service import news_service
 
 # Configure logging
 logging.basicConfig(
@@ -29,9 +30,11 @@ async def lifespan(app: FastAPI):
         await init_db()
         logger.info("Database initialized successfully")
         
-        # LAZY LOAD sentiment engine - initialize only when needed
-        # await sentiment_engine.initialize()
-        logger.info("Sentiment engine will be initialized on first use (lazy loading)")
+        # Load the sentiment models once per process so requests never pay for it
+        if settings.PRELOAD_SENTIMENT_ENGINE:
+            await sentiment_engine.initialize()
+        else:
+            logger.info("Sentiment engine will be initialized on first use (lazy loading)")
         
     except Exception as e:
         logger.error(f"Failed to initialize application: {e}")
@@ -41,6 +44,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Sniper News Intelligence API...")
+    await news_service.client.aclose()
+    await sentiment_engine.aclose()
 
 
 # Create FastAPI app
@@ -50,6 +55,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -90,7 +96,7 @@ async def health_check():
 async def global_exception_handler(request, exc):
     """Global exception handler"""
     logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
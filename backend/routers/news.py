@@ -1,22 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, literal_column, text, bindparam, Integer, String
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
-from datetime import datetime, timedelta
-from database import get_async_db
-from services.news_service import news_service
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict, computed_field
+from datetime import datetime
+from uuid import UUID
+from config import settings
+from database import get_async_db, NEWS_HOURLY_REFRESH_HOURS
+from cache import get_cached, set_cached, invalidate
+from services.news_service import news_service, utc_cutoff, LISTING_LOAD_OPTIONS
+from sentiment.sentiment_engine import sentiment_engine
 from models.news_models import NewsArticle
+import numpy as np
+import asyncio
+import hashlib
+import operator
+import orjson
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/news", tags=["news"])
+router = APIRouter(prefix="/news", tags=["news"], default_response_class=ORJSONResponse)
 
 
 # Pydantic models for request/response
 class NewsArticleResponse(BaseModel):
-    id: str
+    id: UUID
     title: str
     content: str
     summary: Optional[str] = None
@@ -27,8 +37,8 @@ class NewsArticleResponse(BaseModel):
     company_name: Optional[str] = None
     sector: Optional[str] = None
     industry: Optional[str] = None
-    published_at: str
-    created_at: str
+    published_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
     sentiment_score: Optional[float] = None
     sentiment_label: Optional[str] = None
     confidence_score: Optional[float] = None
@@ -38,63 +48,167 @@ class NewsArticleResponse(BaseModel):
     is_processed: bool
     is_archived: bool
     
+    # Build the validator at import time so the first request doesn't pay for it
+    model_config = ConfigDict(from_attributes=True, defer_build=False)
+    
     # New enhanced sentiment fields
-    sentiment_strength: Optional[float] = None
-    sentiment_interpretation: Optional[str] = None
+    @computed_field
+    @property
+    def sentiment_strength(self) -> Optional[float]:
+        return abs(self.sentiment_score) if self.sentiment_score is not None else None
     
-    class Config:
-        from_attributes = True
-        
-    @classmethod
-    def from_orm(cls, obj):
-        """Custom from_orm method to handle UUID and datetime conversion"""
-        
-        # Generate sentiment interpretation if we have the data
-        sentiment_interpretation = None
-        if obj.sentiment_score is not None and obj.confidence_score is not None:
-            strength = abs(obj.sentiment_score)
-            if obj.sentiment_score > 0.15:
-                direction = "Positive" if obj.sentiment_score < 0.4 else "Very Positive"
-            elif obj.sentiment_score < -0.15:
-                direction = "Negative" if obj.sentiment_score > -0.4 else "Very Negative"
-            else:
-                direction = "Neutral"
-                
-            confidence_desc = "High" if obj.confidence_score > 0.8 else "Moderate" if obj.confidence_score > 0.6 else "Low"
-            sentiment_interpretation = f"{direction} ({confidence_desc} confidence)"
-        
-        data = {
-            "id": str(obj.id),
-            "title": obj.title,
-            "content": obj.content,
-            "summary": obj.summary,
-            "url": obj.url,
-            "source": obj.source,
-            "author": obj.author,
-            "ticker_symbol": obj.ticker_symbol,
-            "company_name": obj.company_name,
-            "sector": obj.sector,
-            "industry": obj.industry,
-            "published_at": obj.published_at.isoformat() if obj.published_at else None,
-            "created_at": obj.created_at.isoformat() if obj.created_at else None,
-            "sentiment_score": obj.sentiment_score,
-            "sentiment_label": obj.sentiment_label,
-            "confidence_score": obj.confidence_score,
-            "keywords": obj.keywords,
-            "entities": obj.entities,
-            "market_impact_score": obj.market_impact_score,
-            "is_processed": obj.is_processed,
-            "is_archived": obj.is_archived,
-            "sentiment_strength": abs(obj.sentiment_score) if obj.sentiment_score is not None else None,
-            "sentiment_interpretation": sentiment_interpretation
-        }
-        return cls(**data)
+    @computed_field
+    @property
+    def sentiment_interpretation(self) -> Optional[str]:
+        return _interpret_sentiment(self.sentiment_score, self.confidence_score)
+
+
+# Attribute order for NewsArticleResponse rows; read with a single attrgetter call
+_ARTICLE_FIELDS = (
+    "id", "title", "content", "summary", "url", "source", "author",
+    "ticker_symbol", "company_name", "sector", "industry",
+    "published_at", "created_at",
+    "sentiment_score", "sentiment_label", "confidence_score",
+    "keywords", "entities", "market_impact_score",
+    "is_processed", "is_archived",
+)
+_get_article_fields = operator.attrgetter(*_ARTICLE_FIELDS)
+_SCORE_IDX = _ARTICLE_FIELDS.index("sentiment_score")
+_CONFIDENCE_IDX = _ARTICLE_FIELDS.index("confidence_score")
+
+# Below this many rows the numpy setup costs more than the per-row branches
+VECTORIZE_MIN_ROWS = 64
+
+
+# Interpretation strings, prebuilt once: _INTERPRETATIONS[direction_idx][confidence_idx]
+_DIRECTIONS = ("Very Positive", "Positive", "Neutral", "Negative", "Very Negative")
+_CONFIDENCES = ("High", "Moderate", "Low")
+_INTERPRETATIONS = tuple(
+    tuple(f"{direction} ({confidence} confidence)" for confidence in _CONFIDENCES)
+    for direction in _DIRECTIONS
+)
+
+
+def _interpret_sentiment(score: Optional[float], confidence: Optional[float]) -> Optional[str]:
+    """Human-readable sentiment interpretation for a single article"""
+    if score is None or confidence is None:
+        return None
+    di = 0 if score >= 0.4 else 1 if score > 0.15 else 4 if score <= -0.4 else 3 if score < -0.15 else 2
+    ci = 0 if confidence > 0.8 else 1 if confidence > 0.6 else 2
+    return _INTERPRETATIONS[di][ci]
+
+
+def _interpret_sentiments(scores: List[Optional[float]], confidences: List[Optional[float]]) -> List[Optional[str]]:
+    """Vectorized _interpret_sentiment over a batch of articles"""
+    s = np.array([np.nan if v is None else v for v in scores], dtype=np.float64)
+    c = np.array([np.nan if v is None else v for v in confidences], dtype=np.float64)
+    
+    direction_idx = np.select([s >= 0.4, s > 0.15, s <= -0.4, s < -0.15], [0, 1, 4, 3], default=2)
+    confidence_idx = np.select([c > 0.8, c > 0.6], [0, 1], default=2)
+    missing = np.isnan(s) | np.isnan(c)
+    
+    return [
+        None if m else _INTERPRETATIONS[di][ci]
+        for di, ci, m in zip(direction_idx.tolist(), confidence_idx.tolist(), missing.tolist())
+    ]
+
+
+def serialize_articles(articles) -> List[Dict[str, Any]]:
+    """Convert NewsArticle rows into NewsArticleResponse-shaped dicts in one pass"""
+    rows = [_get_article_fields(article) for article in articles]
+    scores = [row[_SCORE_IDX] for row in rows]
+    confidences = [row[_CONFIDENCE_IDX] for row in rows]
+    
+    if len(rows) >= VECTORIZE_MIN_ROWS:
+        interpretations = _interpret_sentiments(scores, confidences)
+    else:
+        interpretations = [_interpret_sentiment(s, c) for s, c in zip(scores, confidences)]
+    
+    serialized = []
+    for row, score, interpretation in zip(rows, scores, interpretations):
+        # UUID and datetime values are left as-is; orjson encodes them natively
+        data = dict(zip(_ARTICLE_FIELDS, row))
+        data["sentiment_strength"] = abs(score) if score is not None else None
+        data["sentiment_interpretation"] = interpretation
+        serialized.append(data)
+    return serialized
+
+
+def _json_response(payload: bytes, etag: Optional[str] = None) -> Response:
+    """Wrap pre-serialized JSON bytes so cache hits skip validation and encoding"""
+    headers = {"ETag": etag} if etag else None
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+# Cheap fingerprint of a listing window; sum(sentiment_score) catches reprocessed rows.
+# Two statements so the ticker filter can use idx_news_ticker_published_at
+_LIST_SIGNATURE_SQL = """
+    SELECT max(published_at) AS latest, count(*) AS total, sum(sentiment_score) AS score_sum
+    FROM news_articles
+    WHERE published_at >= :cutoff
+      AND is_processed
+"""
+_LIST_SIGNATURE_QUERY = text(_LIST_SIGNATURE_SQL)
+_TICKER_SIGNATURE_QUERY = text(_LIST_SIGNATURE_SQL + "      AND ticker_symbol = :ticker\n")
+
+
+async def _list_etag(db: AsyncSession, hours: int, ticker: Optional[str], limit: int) -> str:
+    """ETag for a news listing, derived from the window signature and request parameters"""
+    params = {"cutoff": utc_cutoff(hours)}
+    if ticker:
+        params["ticker"] = ticker
+        result = await db.execute(_TICKER_SIGNATURE_QUERY, params)
+    else:
+        result = await db.execute(_LIST_SIGNATURE_QUERY, params)
+    row = result.one()
+    signature = f"{row.latest}:{row.total}:{row.score_sum}:{ticker}:{hours}:{limit}"
+    return f'"{hashlib.blake2b(signature.encode(), digest_size=8).hexdigest()}"'
+
+
+async def _cached_listing(
+    request: Request,
+    db: AsyncSession,
+    cache_key: str,
+    hours: int,
+    ticker: Optional[str],
+    limit: int,
+) -> Response:
+    """Serve a listing from cache with its stored ETag; the signature is only computed on a miss"""
+    # Cached as b"<etag>\n<body>"; writes through this API drop every news: key
+    cached = await get_cached(cache_key)
+    if cached is not None:
+        etag, payload = cached.split(b"\n", 1)
+        etag = etag.decode()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return _json_response(payload, etag)
+    
+    etag = await _list_etag(db, hours, ticker, limit)
+    articles = await news_service.get_recent_articles(db, hours, ticker, limit)
+    payload = orjson.dumps(serialize_articles(articles))
+    await set_cached(cache_key, etag.encode() + b"\n" + payload, settings.CACHE_TTL_LIST)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return _json_response(payload, etag)
+
+
+async def _embed_query(query: str) -> List[float]:
+    """Embed search text with FinBERT, memoized in Redis by SHA-256 of the text"""
+    cache_key = f"embedding:{hashlib.sha256(query.encode()).hexdigest()}"
+    cached = await get_cached(cache_key)
+    if cached is not None:
+        return orjson.loads(cached)
+    
+    vector = await sentiment_engine.embed(query)
+    await set_cached(cache_key, orjson.dumps(vector), settings.EMBEDDING_CACHE_TTL)
+    return vector
 
 
 class NewsFetchRequest(BaseModel):
     tickers: Optional[List[str]] = None
     topics: Optional[List[str]] = None
     limit: Optional[int] = 50
+    per_ticker: bool = False  # One feed per ticker instead of articles mentioning all of them
 
 
 class SentimentTrendsResponse(BaseModel):
@@ -104,15 +218,16 @@ class SentimentTrendsResponse(BaseModel):
 
 @router.get("/", response_model=List[NewsArticleResponse])
 async def get_recent_news(
+    request: Request,
     hours: int = Query(24, description="Hours to look back"),
     ticker: Optional[str] = Query(None, description="Filter by ticker symbol"),
-    limit: int = Query(50, description="Maximum number of articles to return"),
+    limit: int = Query(50, ge=1, le=settings.MAX_ARTICLES_PER_REQUEST, description="Maximum number of articles to return"),
     db: AsyncSession = Depends(get_async_db)
 ):
     """Get recent news articles"""
     try:
-        articles = await news_service.get_recent_articles(db, hours, ticker)
-        return [NewsArticleResponse.from_orm(article) for article in articles[:limit]]
+        # Pollers that already hold the current listing get an empty 304
+        return await _cached_listing(request, db, f"news:list:{ticker}:{hours}:{limit}", hours, ticker, limit)
     except Exception as e:
         logger.error(f"Failed to get recent news: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch recent news")
@@ -125,12 +240,17 @@ async def fetch_news(
 ):
     """Fetch and process news from Alpha Vantage"""
     try:
-        articles = await news_service.fetch_and_process_news(
-            db, 
-            tickers=request.tickers, 
-            topics=request.topics
-        )
-        return [NewsArticleResponse.from_orm(article) for article in articles]
+        if request.per_ticker and request.tickers:
+            articles = await news_service.fetch_and_process_companies(db, request.tickers, request.limit or 50)
+        else:
+            articles = await news_service.fetch_and_process_news(
+                db, 
+                tickers=request.tickers, 
+                topics=request.topics
+            )
+        if articles:
+            await invalidate("news:")
+        return _json_response(orjson.dumps(serialize_articles(articles)))
     except Exception as e:
         logger.error(f"Failed to fetch news: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch and process news")
@@ -139,14 +259,15 @@ async def fetch_news(
 @router.get("/company/{symbol}", response_model=List[NewsArticleResponse])
 async def get_company_news(
     symbol: str,
+    request: Request,
     hours: int = Query(24, description="Hours to look back"),
-    limit: int = Query(50, description="Maximum number of articles to return"),
+    limit: int = Query(50, ge=1, le=settings.MAX_ARTICLES_PER_REQUEST, description="Maximum number of articles to return"),
     db: AsyncSession = Depends(get_async_db)
 ):
     """Get news for a specific company"""
     try:
-        articles = await news_service.get_recent_articles(db, hours, symbol.upper())
-        return [NewsArticleResponse.from_orm(article) for article in articles[:limit]]
+        symbol = symbol.upper()
+        return await _cached_listing(request, db, f"news:company:{symbol}:{hours}:{limit}", hours, symbol, limit)
     except Exception as e:
         logger.error(f"Failed to get company news for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch news for {symbol}")
@@ -160,13 +281,40 @@ async def get_sentiment_trends(
 ):
     """Get sentiment trends over time"""
     try:
+        cache_key = f"news:trends:{ticker}:{hours}"
+        cached = await get_cached(cache_key)
+        if cached is not None:
+            return _json_response(cached)
+        
         trends_data = await news_service.get_sentiment_trends(db, ticker, hours)
-        return SentimentTrendsResponse(**trends_data)
+        payload = orjson.dumps(SentimentTrendsResponse(**trends_data).model_dump())
+        await set_cached(cache_key, payload, settings.CACHE_TTL_TRENDS)
+        return _json_response(payload)
     except Exception as e:
         logger.error(f"Failed to get sentiment trends: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch sentiment trends")
 
 
+# Search statements built once at import so SQLAlchemy's compiled cache is reused; requests only bind :q and :limit
+_TSV = literal_column("news_articles.tsv")
+_TS_QUERY = func.plainto_tsquery("english", bindparam("q", type_=String))
+
+_FULLTEXT_SEARCH_QUERY = select(NewsArticle).options(*LISTING_LOAD_OPTIONS).where(_TSV.op("@@")(_TS_QUERY)).order_by(
+    func.ts_rank_cd(_TSV, _TS_QUERY).desc(),
+    NewsArticle.published_at.desc()
+).limit(bindparam("limit", type_=Integer))
+
+_TRIGRAM_SEARCH_QUERY = select(NewsArticle).options(*LISTING_LOAD_OPTIONS).where(
+    NewsArticle.title.op("%")(bindparam("q", type_=String))
+).order_by(
+    func.similarity(NewsArticle.title, bindparam("q", type_=String)).desc()
+).limit(bindparam("limit", type_=Integer))
+
+
+# Text search fetches this many candidates per requested result for the embedding to re-rank
+SEARCH_CANDIDATE_FACTOR = 5
+
+
 @router.get("/search/similar")
 async def search_similar_articles(
     query: str = Query(..., description="Text to find similar articles for"),
@@ -175,24 +323,97 @@ async def search_similar_articles(
 ):
     """Search for articles similar to the given text"""
     try:
-        # For now, we'll use a simple text search
-        # In the future, this could use vector similarity
-        query_filter = or_(
-            NewsArticle.title.ilike(f"%{query}%"),
-            NewsArticle.content.ilike(f"%{query}%")
-        )
+        # Text search picks the candidates, so every result is about the query's subject:
+        # full-text search against the GIN-indexed tsv column created in init_db
+        params = {"q": query, "limit": limit * SEARCH_CANDIDATE_FACTOR}
+        result = await db.execute(_FULLTEXT_SEARCH_QUERY, params)
+        articles = result.scalars().all()
         
-        db_query = select(NewsArticle).where(query_filter).order_by(NewsArticle.published_at.desc()).limit(limit)
+        if not articles:
+            # Typos and partial words miss the stemmed tsquery; try trigram similarity on titles
+            result = await db.execute(_TRIGRAM_SEARCH_QUERY, params)
+            articles = result.scalars().all()
         
-        result = await db.execute(db_query)
-        articles = result.scalars().all()
+        if len(articles) > 1:
+            # Then order the candidates by FinBERT embedding distance to the query
+            try:
+                query_vector = await _embed_query(query)
+            except Exception as e:
+                logger.warning(f"Query embedding failed, keeping text-search order: {e}")
+                query_vector = None
+            
+            if query_vector:
+                ranked = await news_service.search_similar_articles(
+                    db, query_vector, [article.id for article in articles], limit
+                )
+                if ranked:
+                    return serialize_articles(ranked)
         
-        return [NewsArticleResponse.from_orm(article) for article in articles]
+        return serialize_articles(articles[:limit])
     except Exception as e:
         logger.error(f"Failed to search similar articles: {e}")
         raise HTTPException(status_code=500, detail="Failed to search articles")
 
 
+# Per-ticker rows for the /stats window: the news_hourly continuous aggregate, rounded down to the hour,
+# or the raw hypertable for windows reaching past what the aggregate's refresh policy keeps current
+_STATS_SOURCES = {
+    "hourly": """
+        SELECT ticker_symbol, article_count, processed_count, scored_count, sentiment_sum
+        FROM news_hourly
+        WHERE bucket >= time_bucket('1 hour', CAST(:cutoff AS timestamp))
+    """,
+    "raw": """
+        SELECT
+            ticker_symbol,
+            count(*) AS article_count,
+            count(*) FILTER (WHERE is_processed) AS processed_count,
+            count(sentiment_score) AS scored_count,
+            sum(sentiment_score) AS sentiment_sum
+        FROM news_articles
+        WHERE published_at >= CAST(:cutoff AS timestamp)
+        GROUP BY ticker_symbol
+    """,
+}
+
+_STATS_QUERIES = {
+    source: text(f"""
+    WITH f AS ({sql}),
+    totals AS (
+        SELECT
+            sum(article_count) AS total_articles,
+            sum(processed_count) AS processed_articles,
+            sum(sentiment_sum) / nullif(sum(scored_count), 0) AS avg_sentiment
+        FROM f
+    )
+    SELECT
+        totals.total_articles,
+        totals.processed_articles,
+        totals.avg_sentiment,
+        (
+            SELECT coalesce(json_agg(json_build_object('ticker', t.ticker_symbol, 'count', t.count)), '[]'::json)
+            FROM (
+                SELECT ticker_symbol, sum(article_count) AS count
+                FROM f
+                WHERE ticker_symbol IS NOT NULL
+                GROUP BY ticker_symbol
+                ORDER BY sum(article_count) DESC
+                LIMIT 10
+            ) t
+        ) AS top_tickers
+    FROM totals
+""")
+    for source, sql in _STATS_SOURCES.items()
+}
+
+
+def _stats_query(hours: int):
+    """Stats statement for a window; the aggregate's older buckets are never re-materialized"""
+    # Rows loaded before init_db, or rescored after their buckets left the refresh horizon,
+    # only show up in the raw table
+    return _STATS_QUERIES["hourly" if hours <= NEWS_HOURLY_REFRESH_HOURS else "raw"]
+
+
 @router.get("/stats")
 async def get_news_stats(
     hours: int = Query(24, description="Hours to look back"),
@@ -200,74 +421,49 @@ async def get_news_stats(
 ):
     """Get news statistics"""
     try:
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        cache_key = f"news:stats:{hours}"
+        cached = await get_cached(cache_key)
+        if cached is not None:
+            return _json_response(cached)
         
-        # Total articles
-        total_query = select(func.count(NewsArticle.id)).where(
-            NewsArticle.published_at >= cutoff_time
-        )
-        total_result = await db.execute(total_query)
-        total_articles = total_result.scalar() or 0
-        
-        # Processed articles
-        processed_query = select(func.count(NewsArticle.id)).where(
-            and_(
-                NewsArticle.published_at >= cutoff_time,
-                NewsArticle.is_processed == True
-            )
-        )
-        processed_result = await db.execute(processed_query)
-        processed_articles = processed_result.scalar() or 0
+        # All aggregates in one round trip over a single scan of the window
+        result = await db.execute(_stats_query(hours), {"cutoff": utc_cutoff(hours)})
+        row = result.one()
+        total_articles = int(row.total_articles or 0)
+        processed_articles = int(row.processed_articles or 0)
+        avg_sentiment = row.avg_sentiment
+        top_tickers = row.top_tickers
+        if isinstance(top_tickers, (str, bytes)):
+            top_tickers = orjson.loads(top_tickers)
         
-        # Average sentiment
-        sentiment_query = select(func.avg(NewsArticle.sentiment_score)).where(
-            and_(
-                NewsArticle.published_at >= cutoff_time,
-                NewsArticle.sentiment_score.isnot(None)
-            )
-        )
-        sentiment_result = await db.execute(sentiment_query)
-        avg_sentiment = sentiment_result.scalar()
-        
-        # Top tickers
-        ticker_query = select(
-            NewsArticle.ticker_symbol,
-            func.count(NewsArticle.id).label('count')
-        ).where(
-            and_(
-                NewsArticle.published_at >= cutoff_time,
-                NewsArticle.ticker_symbol.isnot(None)
-            )
-        ).group_by(NewsArticle.ticker_symbol).order_by(func.count(NewsArticle.id).desc()).limit(10)
-        
-        ticker_result = await db.execute(ticker_query)
-        top_tickers = [{"ticker": row.ticker_symbol, "count": row.count} for row in ticker_result]
-        
-        return {
+        stats = {
             "total_articles": total_articles,
             "processed_articles": processed_articles,
             "processing_rate": (processed_articles / total_articles * 100) if total_articles > 0 else 0,
             "average_sentiment": float(avg_sentiment) if avg_sentiment else 0.0,
-            "top_tickers": top_tickers,
+            "top_tickers": [{"ticker": t["ticker"], "count": int(t["count"])} for t in top_tickers],
             "time_window_hours": hours
         }
+        payload = orjson.dumps(stats)
+        await set_cached(cache_key, payload, settings.CACHE_TTL_STATS)
+        return _json_response(payload)
     except Exception as e:
         logger.error(f"Failed to get news stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch news statistics")
 
 
+_ARTICLE_BY_ID_QUERY = select(NewsArticle).where(NewsArticle.id == bindparam("article_id"))
+
+
 @router.post("/process/{article_id}")
 async def reprocess_article(
-    article_id: str,
+    article_id: UUID,
     db: AsyncSession = Depends(get_async_db)
 ):
     """Reprocess sentiment analysis for a specific article"""
     try:
-        from uuid import UUID
-        
         # Get article
-        query = select(NewsArticle).where(NewsArticle.id == UUID(article_id))
-        result = await db.execute(query)
+        result = await db.execute(_ARTICLE_BY_ID_QUERY, {"article_id": article_id})
         article = result.scalar_one_or_none()
         
         if not article:
@@ -283,15 +479,16 @@ async def reprocess_article(
                 article.sentiment_label = sentiment_result["sentiment_label"]
                 article.confidence_score = sentiment_result["confidence_score"]
                 
-                if "embedding_vector" in sentiment_result and sentiment_result["embedding_vector"]:
+                if sentiment_result.get("embedding_vector") is not None:
                     article.sentiment_vector = sentiment_result["embedding_vector"]
                 
                 # Use setattr to avoid type issues
                 setattr(article, 'is_processed', True)
                 await db.commit()
-                await db.refresh(article)
+                # Sessions don't expire on commit, so the in-memory article already holds the new values
+                await invalidate("news:")
                 
-                return {"message": "Article reprocessed successfully", "article": NewsArticleResponse.from_orm(article)}
+                return {"message": "Article reprocessed successfully", "article": serialize_articles([article])[0]}
         
         raise HTTPException(status_code=400, detail="Article has no content to process")
         
@@ -302,6 +499,28 @@ async def reprocess_article(
         raise HTTPException(status_code=500, detail="Failed to reprocess article")
 
 
+# Joins against unnested arrays; published_at is part of the hypertable key and lets Timescale prune chunks
+_BULK_SENTIMENT_UPDATE = text("""
+    UPDATE news_articles AS n
+    SET sentiment_score = v.score,
+        sentiment_label = v.label,
+        confidence_score = v.confidence
+    FROM (
+        SELECT
+            unnest(CAST(:ids AS uuid[])) AS id,
+            unnest(CAST(:published AS timestamp[])) AS published_at,
+            unnest(CAST(:scores AS float8[])) AS score,
+            unnest(CAST(:labels AS varchar[])) AS label,
+            unnest(CAST(:confidences AS float8[])) AS confidence
+    ) AS v
+    WHERE n.id = v.id AND n.published_at = v.published_at
+""")
+
+_BINARY_SENTIMENT_QUERY = select(NewsArticle).where(
+    NewsArticle.sentiment_score.in_([-0.5, 0.5])
+).limit(bindparam("batch_size", type_=Integer))
+
+
 @router.post("/reprocess/binary", response_model=Dict[str, Any])
 async def reprocess_binary_articles(
     batch_size: int = Query(default=50, description="Number of articles to reprocess"),
@@ -314,11 +533,7 @@ async def reprocess_binary_articles(
     """
     try:
         # Find articles with binary sentiment scores
-        query = select(NewsArticle).where(
-            NewsArticle.sentiment_score.in_([-0.5, 0.5])
-        ).limit(batch_size)
-        
-        result = await db.execute(query)
+        result = await db.execute(_BINARY_SENTIMENT_QUERY, {"batch_size": batch_size})
         articles = result.scalars().all()
         
         if not articles:
@@ -331,45 +546,55 @@ async def reprocess_binary_articles(
         processed_count = 0
         error_count = 0
         
-        # Initialize sentiment engine
-        from sentiment.sentiment_engine import sentiment_engine
-        await sentiment_engine.initialize()
+        analyze = sentiment_engine.analyze_ensemble if model == "ensemble" else sentiment_engine.analyze_finbert
+        semaphore = asyncio.Semaphore(settings.REPROCESS_CONCURRENCY)
         
-        for article in articles:
-            try:
-                # Get content for analysis
-                content = getattr(article, 'content', None) or getattr(article, 'title', None)
-                if not content or not content.strip():
-                    logger.warning(f"No content for article {article.id}")
-                    error_count += 1
-                    continue
-                
-                # Choose analysis method based on parameter
-                if model == "ensemble":
-                    sentiment_result = await sentiment_engine.analyze_ensemble(content)
-                else:
-                    sentiment_result = await sentiment_engine.analyze_finbert(content)
-                
-                if sentiment_result:
-                    # Update article with new sentiment data
-                    setattr(article, 'sentiment_score', sentiment_result.get("sentiment_score"))
-                    setattr(article, 'sentiment_label', sentiment_result.get("sentiment_label"))
-                    setattr(article, 'confidence_score', sentiment_result.get("confidence_score"))
-                    
-                    processed_count += 1
-                    logger.info(f"Reprocessed article {article.id}: {getattr(article, 'sentiment_score', 0):.4f}")
-                else:
-                    error_count += 1
-                    logger.error(f"Failed to analyze sentiment for article {article.id}")
+        async def analyze_article(article):
+            # Get content for analysis
+            content = getattr(article, 'content', None) or getattr(article, 'title', None)
+            if not content or not content.strip():
+                logger.warning(f"No content for article {article.id}")
+                return None
+            async with semaphore:
+                return await analyze(content)
+        
+        # Analyze concurrently; the semaphore bounds in-flight model/API calls
+        results = await asyncio.gather(
+            *(analyze_article(article) for article in articles),
+            return_exceptions=True
+        )
+        
+        # Column-wise parameters for a single bulk UPDATE
+        updates = {"ids": [], "published": [], "scores": [], "labels": [], "confidences": []}
+        
+        for article, sentiment_result in zip(articles, results):
+            if isinstance(sentiment_result, Exception):
+                logger.error(f"Error processing article {article.id}: {sentiment_result}")
+                error_count += 1
+            elif sentiment_result:
+                updates["ids"].append(article.id)
+                updates["published"].append(article.published_at)
+                updates["scores"].append(sentiment_result.get("sentiment_score"))
+                updates["labels"].append(sentiment_result.get("sentiment_label"))
+                updates["confidences"].append(sentiment_result.get("confidence_score"))
                 
-            except Exception as e:
-                logger.error(f"Error processing article {article.id}: {e}")
+                processed_count += 1
+            else:
                 error_count += 1
-                continue
+                logger.error(f"Failed to analyze sentiment for article {article.id}")
         
-        # Commit all changes
+        # Write all changes in one statement and commit
+        if processed_count:
+            await db.execute(_BULK_SENTIMENT_UPDATE, updates)
         await db.commit()
         
+        # One summary line per batch instead of one per article
+        logger.info("Reprocessed %d binary-score articles with %s (%d errors)", processed_count, model, error_count)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Reprocessed article ids: %s", ", ".join(str(article_id) for article_id in updates["ids"]))
+        if processed_count:
+            await invalidate("news:")
+        
         return {
             "message": f"Batch reprocessing completed",
             "processed": processed_count,
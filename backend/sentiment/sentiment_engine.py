@@ -1,40 +1,156 @@
 import asyncio
+from collections import OrderedDict
+import hashlib
+import math
+import re
+import threading
 import time
-from typing import List, Dict, Any, Optional, Tuple
+from itertools import islice
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple
 import numpy as np
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
+import httpx
 import openai
+import orjson
 from config import settings
+from cache import get_cached, set_cached
 import logging
 
 logger = logging.getLogger(__name__)
 
+# FinBERT truncates to 512 tokens; this character cap sits well past what 512 tokens of English news span
+# and only bounds tokenizer work and cache key size
+MAX_INPUT_CHARS = 8 * 512
+
+# Runs of whitespace (newlines and tabs from feed HTML included) collapse to one space
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# The OpenAI prompt keeps its original budget of article text
+OPENAI_MAX_CHARS = 512
+
+# Completion budget per text when several texts share one OpenAI request (no reasoning field)
+OPENAI_BATCH_TOKENS_PER_TEXT = 60
+
+# Sequence-length buckets: mixed-length batches are split along them, and with CUDA graphs
+# enabled each is recorded once and a batch is padded up to the smallest bucket that fits
+CUDA_GRAPH_SEQ_LENS = (64, 128, 256, 512)
+
 
 class SentimentEngine:
+    # FinBERT score -> label: a score above LABEL_BOUNDS[i] (and at or below the next bound) maps to SCORE_LABELS[i + 1]
+    LABEL_BOUNDS = np.array([-0.3, -0.1, 0.1, 0.3])
+    SCORE_LABELS = np.array(["strongly_negative", "negative", "neutral", "positive", "strongly_positive"])
+    # FinBERT's classes, in logit order: negative, neutral, positive
+    NUM_LABELS = 3
+    # Ensemble score -> label, same lookup as above with wider bounds
+    ENSEMBLE_BOUNDS = np.array([-0.4, -0.15, 0.15, 0.4])
+    # Combine with weighted average (favor FinBERT for financial text)
+    FINBERT_WEIGHT = 0.7
+    OPENAI_WEIGHT = 0.3
+    
     def __init__(self):
         self.finbert_tokenizer = None
         self.finbert_model = None
         self.openai_client = None
+        # Connection pool behind openai_client, kept so shutdown can close it
+        self._http: Optional[httpx.AsyncClient] = None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self._initialized = False
+        self._init_lock = threading.Lock()
+        # Forward passes run in worker threads; this serializes them and guards the shared caches
+        self._model_lock = threading.Lock()
+        # Token-id cache and tokenizer are used from both the event loop (length ordering) and forward threads
+        self._token_lock = threading.Lock()
+        # Set when _reduce_precision swaps in the dynamically quantized INT8 model
+        self._quantized = False
+        # Token ids per preprocessed text (LRU); reprocessing and duplicate feeds skip re-tokenizing
+        self._token_cache: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        # Scored FinBERT rows keyed by a digest of the preprocessed text; wire stories are re-published often
+        self._finbert_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        # OpenAI results by cache key (LRU), plus calls in flight so concurrent duplicates share one request
+        self._openai_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._openai_inflight: Dict[str, asyncio.Future] = {}
+        # Circuit breaker: after OPENAI_BREAKER_THRESHOLD consecutive failures, skip the API until the cooldown ends
+        self._openai_failures = 0
+        self._openai_open_until = 0.0
+        # Dynamic batching: concurrent analyze_finbert calls are queued and share forward passes
+        self._finbert_queue: Optional[asyncio.Queue] = None
+        self._finbert_batcher: Optional[asyncio.Task] = None
+        # seq_len -> (graph, static input_ids, static packed output); empty unless FINBERT_CUDA_GRAPHS
+        self._cuda_graphs: Dict[int, Tuple[Any, torch.Tensor, torch.Tensor]] = {}
         
     async def initialize(self):
         """Initialize the sentiment analysis models"""
+        self.initialize_sync()
+    
+    def initialize_sync(self):
+        """Load the models without an event loop (model loading never awaits anything)"""
         if self._initialized:
             return
-            
+        
+        # Worker warmup and the first requests can race here; only one of them loads the models
+        with self._init_lock:
+            if not self._initialized:
+                self._load_models()
+    
+    def _load_models(self):
+        """Load FinBERT and the OpenAI client; caller holds _init_lock"""
         try:
             # Initialize FinBERT
             logger.info("Loading FinBERT model...")
-            self.finbert_tokenizer = AutoTokenizer.from_pretrained(settings.FINBERT_MODEL_NAME)
-            self.finbert_model = AutoModelForSequenceClassification.from_pretrained(settings.FINBERT_MODEL_NAME)
+            self.finbert_tokenizer = AutoTokenizer.from_pretrained(settings.FINBERT_MODEL_NAME, use_fast=True)
+            # Stream weights straight into the model (no second FP32 copy in RAM), already in the CUDA dtype
+            self.finbert_model = AutoModelForSequenceClassification.from_pretrained(
+                settings.FINBERT_MODEL_NAME,
+                low_cpu_mem_usage=True,
+                torch_dtype=self._load_dtype()
+            )
             self.finbert_model.to(self.device)
             self.finbert_model.eval()
+            # Inference only: frozen weights let torch.compile trace forward-only graphs with no autograd state
+            self.finbert_model.requires_grad_(False)
+            self.finbert_model = self._reduce_precision(self.finbert_model)
+            
+            if self.device.type == "cpu" and settings.FINBERT_NUM_THREADS > 0:
+                # Each prefork child otherwise spins up a thread per core and they all fight over the same cores
+                torch.set_num_threads(settings.FINBERT_NUM_THREADS)
+            
+            if self.device.type == "cuda":
+                # TF32 matmuls on Ampere+ for anything still running in FP32
+                torch.set_float32_matmul_precision("high")
+            
+            compile_model = settings.FINBERT_COMPILE
+            if compile_model and self._quantized:
+                # Dynamic-quantized Linear ops are opaque to Inductor; compiling them only adds startup time
+                logger.info("Skipping torch.compile for the INT8-quantized FinBERT")
+                compile_model = False
+            
+            if compile_model:
+                eager_model = self.finbert_model
+                # Padded batch lengths vary, so compile for dynamic shapes; "reduce-overhead" adds
+                # cudagraphs per seen shape, which pays off once the length buckets are all warm
+                self.finbert_model = torch.compile(eager_model, mode=settings.FINBERT_COMPILE_MODE, dynamic=True)
+                if not self._warmup():
+                    logger.warning("torch.compile of FinBERT failed, falling back to eager mode")
+                    self.finbert_model = eager_model
+                    self._warmup()
+            else:
+                if settings.FINBERT_CUDA_GRAPHS and self.device.type == "cuda":
+                    self._capture_cuda_graphs()
+                self._warmup()
             
             # Initialize OpenAI client
             if settings.OPENAI_API_KEY:
-                self.openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+                # One pooled HTTP/2 client: a batch's concurrent requests multiplex over warm TLS connections
+                self._http = httpx.AsyncClient(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=settings.HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+                    )
+                )
+                self.openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=self._http)
             
             self._initialized = True
             logger.info("Sentiment engine initialized successfully")
@@ -43,117 +159,619 @@ class SentimentEngine:
             logger.error(f"Failed to initialize sentiment engine: {e}")
             raise
     
+    async def aclose(self):
+        """Close the OpenAI connection pool"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self.openai_client = None
+    
+    def _load_dtype(self) -> Optional[torch.dtype]:
+        """Dtype to load FinBERT's weights in; None keeps FP32, which CPU needs (FP16 isn't accelerated there)"""
+        precision = settings.FINBERT_PRECISION
+        if self.device.type != "cuda" or precision == "fp32":
+            return None
+        if precision == "bf16" or (precision == "auto" and torch.cuda.is_bf16_supported()):
+            return torch.bfloat16
+        return torch.float16
+    
+    def _reduce_precision(self, model):
+        """Cast FinBERT to BF16/FP16 on CUDA or dynamically quantize its Linear layers to INT8 on CPU"""
+        precision = settings.FINBERT_PRECISION
+        if precision == "fp32":
+            return model
+        
+        try:
+            if self.device.type == "cuda":
+                # BF16 keeps FP32's exponent range (no overflow in attention scores); Ampere+ only
+                if precision == "bf16" or (precision == "auto" and torch.cuda.is_bf16_supported()):
+                    logger.info("Casting FinBERT to BF16")
+                    return model.to(torch.bfloat16)
+                if precision == "int8":
+                    # Dynamic quantization is CPU-only, and 8-bit GPU matmuls don't beat FP16 at BERT-base size
+                    logger.warning("INT8 FinBERT is only supported on CPU, using FP16 on CUDA")
+                if precision in ("auto", "fp16", "int8"):
+                    logger.info("Casting FinBERT to FP16")
+                    return model.half()
+            if self.device.type == "cpu" and precision in ("auto", "int8"):
+                logger.info("Applying dynamic INT8 quantization to FinBERT")
+                # Weights are quantized once here; activations (and so the [CLS] embedding) stay FP32
+                quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self._quantized = True
+                return quantized
+        except Exception as e:
+            # Quantization support depends on the torch build / CPU; FP32 still works
+            logger.warning(f"Could not reduce FinBERT precision ({precision}), keeping FP32: {e}")
+        
+        return model
+    
+    def _warmup(self) -> bool:
+        """Run one forward pass so CUDA context setup and graph compilation happen before real traffic"""
+        try:
+            self._finbert_forward(["Company shares rose after quarterly earnings beat expectations."])
+            return True
+        except Exception as e:
+            logger.warning(f"FinBERT warmup failed: {e}")
+            return False
+    
     def _preprocess_text(self, text: str) -> str:
         """Preprocess text for sentiment analysis"""
-        # Basic preprocessing
-        text = text.strip()
-        if len(text) > 512:  # FinBERT max length
-            text = text[:512]
-        return text
+        # One regex pass; BERT tokenization ignores whitespace runs anyway, and collapsing them lets
+        # the token/result caches and the OpenAI budget treat re-wrapped copies of a story as one text
+        return _WHITESPACE_RE.sub(" ", text).strip()[:MAX_INPUT_CHARS]
     
-    async def analyze_finbert(self, text: str) -> Dict[str, Any]:
-        """Analyze sentiment using FinBERT with improved scoring"""
-        if not self._initialized:
-            await self.initialize()
+    def _token_ids(self, texts: List[str]) -> List[Tuple[int, ...]]:
+        """Token ids per preprocessed text, truncated to FinBERT's max length
+
+        Cache misses are encoded together in one call, so the fast tokenizer
+        handles the whole batch at once instead of one string per call.
+        """
+        assert self.finbert_tokenizer is not None
+        # The whole lookup + encode runs under the lock: the fast tokenizer is not
+        # reentrant and raises "Already borrowed" when two threads encode at once
+        with self._token_lock:
+            ids: List[Optional[Tuple[int, ...]]] = []
+            for text in texts:
+                token_ids = self._token_cache.get(text)
+                if token_ids is not None:
+                    self._token_cache.move_to_end(text)
+                ids.append(token_ids)
             
-        # Ensure models are loaded
-        if self.finbert_tokenizer is None or self.finbert_model is None:
-            await self.initialize()
+            misses = list(dict.fromkeys(text for text, token_ids in zip(texts, ids) if token_ids is None))
+            if misses:
+                encoded = self.finbert_tokenizer(misses, truncation=True, max_length=512)["input_ids"]
+                fresh = {text: tuple(token_ids) for text, token_ids in zip(misses, encoded)}
+                for text, token_ids in fresh.items():
+                    self._token_cache[text] = token_ids
+                while len(self._token_cache) > settings.TOKENIZER_CACHE_SIZE:
+                    self._token_cache.popitem(last=False)
+                ids = [token_ids if token_ids is not None else fresh[text] for text, token_ids in zip(texts, ids)]
+        
+        return ids
+    
+    def _to_device(self, inputs) -> Dict[str, torch.Tensor]:
+        """Move tokenizer output to the model's device"""
+        if self.device.type != "cuda":
+            return dict(inputs)
+        # Pinned host memory lets the H2D copy run asynchronously; the forward pass is queued on the same stream
+        return {key: tensor.pin_memory().to(self.device, non_blocking=True) for key, tensor in inputs.items()}
+    
+    def _capture_cuda_graphs(self):
+        """Record one CUDA graph per sequence-length bucket at batch size SENTIMENT_BATCH_SIZE"""
+        assert self.finbert_tokenizer is not None
+        batch_size = settings.SENTIMENT_BATCH_SIZE
+        pad_token_id = self.finbert_tokenizer.pad_token_id
+        
+        try:
+            for seq_len in CUDA_GRAPH_SEQ_LENS:
+                static_ids = torch.full((batch_size, seq_len), pad_token_id, dtype=torch.long, device=self.device)
+                
+                # Warm up on a side stream first so capture doesn't record one-time allocations
+                stream = torch.cuda.Stream()
+                stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(stream), torch.inference_mode():
+                    for _ in range(3):
+                        self._packed_forward(static_ids)
+                torch.cuda.current_stream().wait_stream(stream)
+                
+                graph = torch.cuda.CUDAGraph()
+                with torch.inference_mode(), torch.cuda.graph(graph):
+                    static_packed = self._packed_forward(static_ids)
+                self._cuda_graphs[seq_len] = (graph, static_ids, static_packed)
             
-        # Type assertion for linter
+            logger.info(f"Captured FinBERT CUDA graphs for sequence lengths {CUDA_GRAPH_SEQ_LENS}")
+        except Exception as e:
+            logger.warning(f"CUDA graph capture failed, using eager FinBERT: {e}")
+            self._cuda_graphs = {}
+    
+    def _packed_forward(self, input_ids: torch.Tensor) -> torch.Tensor:
+        """One FinBERT forward pass on device, returning [probabilities | [CLS] embedding] per row"""
         assert self.finbert_tokenizer is not None
         assert self.finbert_model is not None
+        
+        # The attention mask is rebuilt on device from the padding
+        attention_mask = (input_ids != self.finbert_tokenizer.pad_token_id).long()
+        # One forward pass yields both the logits and the hidden states for the embedding
+        outputs = self.finbert_model(input_ids=input_ids, attention_mask=attention_mask, output_hidden_states=True)
+        # Softmax in FP32 even when the model runs in FP16
+        probabilities = torch.softmax(outputs.logits.float(), dim=1)
+        embeddings = outputs.hidden_states[-1][:, 0, :].float()
+        return torch.cat([probabilities, embeddings], dim=1)
+    
+    def _finbert_forward(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Run FinBERT over a batch of preprocessed texts, returning class probabilities and [CLS] embeddings"""
+        token_ids = self._token_ids(texts)
+        buckets = self._length_buckets([len(ids) for ids in token_ids])
+        if len(buckets) == 1:
+            return self._forward_token_ids(token_ids)
+        
+        # Mixed lengths: one pass per length bucket so short texts aren't padded to the longest one
+        probabilities = embeddings = None
+        for indices in buckets:
+            bucket_probs, bucket_embeddings = self._forward_token_ids([token_ids[i] for i in indices])
+            if probabilities is None:
+                probabilities = np.empty((len(texts), bucket_probs.shape[1]), dtype=bucket_probs.dtype)
+                embeddings = np.empty((len(texts), bucket_embeddings.shape[1]), dtype=bucket_embeddings.dtype)
+            probabilities[indices] = bucket_probs
+            embeddings[indices] = bucket_embeddings
+        return probabilities, embeddings
+    
+    @staticmethod
+    def _length_buckets(lengths: List[int]) -> List[List[int]]:
+        """Group indices by the smallest CUDA_GRAPH_SEQ_LENS bucket their token count fits in"""
+        buckets: Dict[int, List[int]] = {}
+        for i, length in enumerate(lengths):
+            bucket = next((seq_len for seq_len in CUDA_GRAPH_SEQ_LENS if seq_len >= length), CUDA_GRAPH_SEQ_LENS[-1])
+            buckets.setdefault(bucket, []).append(i)
+        return [buckets[seq_len] for seq_len in sorted(buckets)]
+    
+    def _forward_token_ids(self, token_ids: List[Tuple[int, ...]]) -> Tuple[np.ndarray, np.ndarray]:
+        """One padded FinBERT forward pass over already tokenized texts"""
+        assert self.finbert_tokenizer is not None
+        assert self.finbert_model is not None
+        
+        # Pad the batch to its longest member; on GPU round up to a multiple of 8 so the attention
+        # matmuls get tensor-core aligned shapes (on CPU the extra columns would only be wasted work)
+        padded = self.finbert_tokenizer.pad(
+            {"input_ids": [list(ids) for ids in token_ids]},
+            padding=True,
+            pad_to_multiple_of=8 if self.device.type == "cuda" else None,
+            return_tensors="pt"
+        )
+        # Only input_ids cross to the device
+        input_ids = self._to_device({"input_ids": padded["input_ids"]})["input_ids"]
+        batch_size, seq_len = input_ids.shape
+        
+        with torch.inference_mode():
+            bucket = next((length for length in CUDA_GRAPH_SEQ_LENS if length >= seq_len), None)
+            if bucket in self._cuda_graphs and batch_size <= settings.SENTIMENT_BATCH_SIZE:
+                # Replay the recorded kernels on the static buffers; unused rows stay all-padding
+                graph, static_ids, static_packed = self._cuda_graphs[bucket]
+                static_ids.fill_(self.finbert_tokenizer.pad_token_id)
+                static_ids[:batch_size, :seq_len].copy_(input_ids)
+                graph.replay()
+                packed_tensor = static_packed[:batch_size]
+            else:
+                packed_tensor = self._packed_forward(input_ids)
             
+            # One device-to-host copy (and sync) for both results instead of two
+            packed = packed_tensor.cpu().numpy()
+        
+        return packed[:, :self.NUM_LABELS], packed[:, self.NUM_LABELS:]
+    
+    def _score_batch(self, probabilities: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized sentiment scores, labels and confidences for a (batch, 3) probability matrix"""
+        probs = probabilities.astype(np.float64)
+        
+        # Calculate more nuanced sentiment score
+        # Instead of just -0.5, 0, +0.5, use actual probability-weighted score
+        scores = probs[:, 2] - probs[:, 0]  # Range: -1 to +1
+        
+        # More granular labeling: one binary search per row into the bounds, then a gather from the label table
+        labels = self.SCORE_LABELS[np.searchsorted(self.LABEL_BOUNDS, scores, side="left")]
+        
+        # Confidence is the maximum probability
+        confidences = probs.max(axis=1)
+        
+        return scores, labels, confidences
+    
+    def _finbert_result(
+        self,
+        probs: List[float],
+        sentiment_score: float,
+        sentiment_label: str,
+        confidence_score: float,
+        embedding: np.ndarray,
+        processing_time_ms: int
+    ) -> Dict[str, Any]:
+        """Package one text's precomputed FinBERT scores into its result dict"""
+        negative_prob, neutral_prob, positive_prob = probs
+        
+        return {
+            "sentiment_score": sentiment_score,
+            "sentiment_label": sentiment_label,
+            "confidence_score": confidence_score,
+            # 1-D float32 array; pgvector's Vector type binds it directly, without a list of 768 Python floats
+            "embedding_vector": embedding,
+            "processing_time_ms": processing_time_ms,
+            "model_name": "finbert",
+            "probability_breakdown": {
+                "negative": negative_prob,
+                "neutral": neutral_prob, 
+                "positive": positive_prob
+            },
+            "sentiment_strength": abs(sentiment_score),  # How strong the sentiment is
+            "certainty": confidence_score  # How certain the model is
+        }
+    
+    async def analyze_finbert(self, text: str) -> Dict[str, Any]:
+        """Analyze sentiment using FinBERT with improved scoring"""
+        # The batcher task dies with its event loop (e.g. each asyncio.run in a Celery task), so restart it per loop
+        if self._finbert_batcher is None or self._finbert_batcher.done():
+            self._finbert_queue = asyncio.Queue()
+            self._finbert_batcher = asyncio.create_task(self._run_finbert_batcher(self._finbert_queue))
+        
+        assert self._finbert_queue is not None
+        future = asyncio.get_running_loop().create_future()
+        await self._finbert_queue.put((text, future))
+        return await future
+    
+    async def _run_finbert_batcher(self, queue: asyncio.Queue):
+        """Collect queued texts for up to FINBERT_BATCH_WAIT_MS and score them in one batch"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            pending = [await queue.get()]
+            deadline = loop.time() + settings.FINBERT_BATCH_WAIT_MS / 1000
+            
+            while len(pending) < settings.SENTIMENT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = await self.analyze_finbert_batch([text for text, _ in pending])
+                for (_, future), result in zip(pending, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                # Only model loading can raise here; fail the waiting callers, keep the batcher alive
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    async def analyze_finbert_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Analyze several texts with a single batched FinBERT forward pass"""
+        # Off the event loop, so concurrent OpenAI requests keep progressing during the forward pass
+        return await asyncio.to_thread(self.analyze_finbert_batch_sync, texts)
+    
+    def analyze_finbert_sync(self, text: str) -> Dict[str, Any]:
+        """Analyze one text with FinBERT from synchronous code such as Celery tasks"""
+        return self.analyze_finbert_batch_sync([text])[0]
+    
+    def analyze_finbert_batch_sync(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Synchronous core of analyze_finbert_batch; the forward pass itself never awaits"""
+        if not texts:
+            return []
+        
+        with self._model_lock:
+            # Ensure models are loaded
+            if not self._initialized or self.finbert_tokenizer is None or self.finbert_model is None:
+                self.initialize_sync()
+            return self._finbert_batch_locked(texts)
+    
+    def _finbert_batch_locked(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Score texts through the result cache and FinBERT; caller holds _model_lock"""
         start_time = time.time()
         
         try:
             # Preprocess text
-            processed_text = self._preprocess_text(text)
-            
-            # Tokenize
-            inputs = self.finbert_tokenizer(
-                processed_text,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512,
-                padding=True
-            ).to(self.device)
-            
-            # Get predictions with probabilities
-            with torch.no_grad():
-                outputs = self.finbert_model(**inputs)
-                probabilities = torch.softmax(outputs.logits, dim=1)
-                predictions = torch.argmax(outputs.logits, dim=1)
+            processed_texts = [self._preprocess_text(text) for text in texts]
+            keys = [hashlib.blake2b(text.encode(), digest_size=16).digest() for text in processed_texts]
             
-            # Extract actual probability values
-            probs = probabilities.cpu().numpy()[0]
-            negative_prob = float(probs[0])
-            neutral_prob = float(probs[1]) 
-            positive_prob = float(probs[2])
+            rows = [self._cached_finbert_row(key) for key in keys]
+            processing_times = [0] * len(texts)
+            misses = [i for i, row in enumerate(rows) if row is None]
             
-            # Calculate more nuanced sentiment score
-            # Instead of just -0.5, 0, +0.5, use actual probability-weighted score
-            sentiment_score = (positive_prob - negative_prob)  # Range: -1 to +1
-            
-            # More granular labeling
-            if sentiment_score > 0.3:
-                sentiment_label = "strongly_positive"
-            elif sentiment_score > 0.1:
-                sentiment_label = "positive"
-            elif sentiment_score > -0.1:
-                sentiment_label = "neutral"
-            elif sentiment_score > -0.3:
-                sentiment_label = "negative"
-            else:
-                sentiment_label = "strongly_negative"
-            
-            # Confidence is the maximum probability
-            confidence_score = float(probabilities.max().item())
-            
-            # Get embedding for vector storage
-            embedding = self.finbert_model(**inputs, output_hidden_states=True).hidden_states[-1][:, 0, :].cpu().detach().numpy()
-            
-            processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+            if misses:
+                probabilities, embeddings = self._finbert_forward([processed_texts[i] for i in misses])
+                
+                # The forward pass is shared, so attribute its time evenly across the batch
+                processing_time = int((time.time() - start_time) * 1000 / len(misses))  # Convert to milliseconds
+                
+                # Score the whole batch at once; only dict packaging stays per text
+                scores, labels, confidences = self._score_batch(probabilities)
+                
+                for i, probs, score, label, confidence, embedding in zip(
+                    misses,
+                    probabilities.astype(np.float64).tolist(),
+                    scores.tolist(),
+                    labels.tolist(),
+                    confidences.tolist(),
+                    embeddings
+                ):
+                    # Copy so the cache doesn't pin the whole batch's output array
+                    rows[i] = (probs, score, label, confidence, embedding.copy())
+                    processing_times[i] = processing_time
+                    self._cache_finbert_row(keys[i], rows[i])
             
-            return {
-                "sentiment_score": sentiment_score,
-                "sentiment_label": sentiment_label,
-                "confidence_score": confidence_score,
-                "embedding_vector": embedding.flatten().tolist(),
-                "processing_time_ms": int(processing_time),
-                "model_name": "finbert",
-                "probability_breakdown": {
-                    "negative": negative_prob,
-                    "neutral": neutral_prob, 
-                    "positive": positive_prob
-                },
-                "sentiment_strength": abs(sentiment_score),  # How strong the sentiment is
-                "certainty": confidence_score  # How certain the model is
-            }
+            return [
+                self._finbert_result(*row, processing_time)
+                for row, processing_time in zip(rows, processing_times)
+            ]
             
         except Exception as e:
             logger.error(f"FinBERT analysis failed: {e}")
-            return {
-                "sentiment_score": 0.0,
-                "sentiment_label": "neutral",
-                "confidence_score": 0.0,
-                "embedding_vector": None,
-                "processing_time_ms": 0,
-                "model_name": "finbert",
-                "error": str(e)
-            }
+            return [
+                {
+                    "sentiment_score": 0.0,
+                    "sentiment_label": "neutral",
+                    "confidence_score": 0.0,
+                    "embedding_vector": None,
+                    "processing_time_ms": 0,
+                    "model_name": "finbert",
+                    "error": str(e)
+                }
+                for _ in texts
+            ]
+    
+    def _cached_finbert_row(self, key: bytes) -> Optional[tuple]:
+        """Look up a scored FinBERT row, marking it most recently used"""
+        row = self._finbert_cache.get(key)
+        if row is not None:
+            self._finbert_cache.move_to_end(key)
+        return row
+    
+    def _cache_finbert_row(self, key: bytes, row: tuple):
+        """Remember a scored FinBERT row, evicting the least recently used past FINBERT_RESULT_CACHE_SIZE"""
+        self._finbert_cache[key] = row
+        self._finbert_cache.move_to_end(key)
+        if len(self._finbert_cache) > settings.FINBERT_RESULT_CACHE_SIZE:
+            self._finbert_cache.popitem(last=False)
+    
+    async def embed(self, text: str) -> List[float]:
+        """Get the FinBERT [CLS] embedding used for sentiment_vector similarity search"""
+        if not self._initialized:
+            await self.initialize()
+        
+        return await asyncio.to_thread(self._embed_sync, text)
+    
+    def _embed_sync(self, text: str) -> List[float]:
+        """Encoder-only forward for one text, run in a worker thread"""
+        assert self.finbert_tokenizer is not None
+        assert self.finbert_model is not None
+        
+        with self._model_lock:
+            # Through the token-id cache: an article's text is usually already tokenized from scoring
+            token_ids = self._token_ids([self._preprocess_text(text)])[0]
+            inputs = self._to_device({"input_ids": torch.tensor([token_ids])})
+            
+            # Only the encoder is needed: skip the classification head and don't keep every layer's hidden states
+            with torch.inference_mode():
+                outputs = self.finbert_model.base_model(**inputs)
+            
+            return outputs.last_hidden_state[:, 0, :].float().cpu().numpy().flatten().tolist()
     
     async def analyze_openai(self, text: str) -> Optional[Dict[str, Any]]:
         """Analyze sentiment using OpenAI"""
         if not self.openai_client:
             logger.warning("OpenAI client not initialized")
             return None
+        
+        # Preprocess text
+        processed_text = self._preprocess_text(text)[:OPENAI_MAX_CHARS]
+        
+        cache_key = self._openai_cache_key(processed_text)
+        
+        cached_result = self._openai_cache.get(cache_key)
+        if cached_result is not None:
+            self._openai_cache.move_to_end(cache_key)
+            return dict(cached_result)
+        
+        inflight = self._openai_inflight.get(cache_key)
+        if inflight is not None:
+            # Same text already being fetched (e.g. duplicates in one batch); wait for that answer
+            result = await asyncio.shield(inflight)
+            return None if result is None else dict(result)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._openai_inflight[cache_key] = future
+        result = None
+        try:
+            result = await self._fetch_openai(cache_key, processed_text)
+        finally:
+            # _fetch_openai doesn't raise, so waiters only see None if this call was cancelled
+            future.set_result(result)
+            del self._openai_inflight[cache_key]
+        
+        if result is not None:
+            self._remember_openai(cache_key, result)
+            return dict(result)
+        return None
+    
+    @staticmethod
+    def _openai_cache_key(processed_text: str) -> str:
+        """Cache key for an OpenAI result; identical text gets an identical answer at this temperature"""
+        return "openai:" + hashlib.sha256(f"{settings.OPENAI_MODEL}:{processed_text}".encode()).hexdigest()
+    
+    def _remember_openai(self, cache_key: str, result: Dict[str, Any]):
+        """Keep an OpenAI result in the local LRU, evicting past OPENAI_LOCAL_CACHE_SIZE"""
+        self._openai_cache[cache_key] = result
+        self._openai_cache.move_to_end(cache_key)
+        if len(self._openai_cache) > settings.OPENAI_LOCAL_CACHE_SIZE:
+            self._openai_cache.popitem(last=False)
+    
+    async def analyze_openai_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Analyze several texts with OpenAI, sending every uncached text in one request
+
+        Texts the batched reply doesn't answer usably (a mismatched reply, or an entry with
+        non-numeric scores) fall back to one analyze_openai call each. A failed request counts
+        toward the circuit breaker and leaves its texts unscored rather than re-sending each one.
+        """
+        if not self.openai_client:
+            logger.warning("OpenAI client not initialized")
+            return [None] * len(texts)
+        
+        processed_texts = [self._preprocess_text(text)[:OPENAI_MAX_CHARS] for text in texts]
+        cache_keys = [self._openai_cache_key(processed_text) for processed_text in processed_texts]
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        for cache_key in cache_keys:
+            cached_result = self._openai_cache.get(cache_key)
+            if cached_result is not None:
+                self._openai_cache.move_to_end(cache_key)
+                results[cache_key] = cached_result
+        
+        # Distinct misses in input order, then the shared Redis cache for all of them at once
+        pending = {
+            cache_key: processed_text
+            for cache_key, processed_text in zip(cache_keys, processed_texts)
+            if cache_key not in results
+        }
+        if pending:
+            cached = await asyncio.gather(*(get_cached(cache_key) for cache_key in pending))
+            for cache_key, payload in zip(list(pending), cached):
+                if payload is not None:
+                    results[cache_key] = orjson.loads(payload)
+                    self._remember_openai(cache_key, results[cache_key])
+                    del pending[cache_key]
+        
+        if len(pending) > 1 and time.monotonic() >= self._openai_open_until:
+            fetched = await self._fetch_openai_batch(list(pending.values()))
+            if fetched is None:
+                # The API itself failed; per-text retries would only repeat the failure N times
+                return [dict(results[cache_key]) if cache_key in results else None for cache_key in cache_keys]
+            await asyncio.gather(*(
+                set_cached(cache_key, orjson.dumps(result), settings.OPENAI_CACHE_TTL)
+                for cache_key, result in zip(pending, fetched)
+                if result is not None
+            ))
+            for cache_key, result in zip(pending, fetched):
+                if result is not None:
+                    results[cache_key] = result
+                    self._remember_openai(cache_key, result)
             
+            # Texts the batched reply didn't answer usably are retried alone; per-text requests
+            # still get the breaker and in-flight sharing of analyze_openai
+            retry = {cache_key: text for cache_key, text in pending.items() if cache_key not in results}
+            retried = await asyncio.gather(*(self.analyze_openai(text) for text in retry.values()))
+            for cache_key, result in zip(retry, retried):
+                if result is not None:
+                    results[cache_key] = result
+        elif pending:
+            # One text (or breaker open): the single-text path handles both
+            for cache_key, text in pending.items():
+                result = await self.analyze_openai(text)
+                if result is not None:
+                    results[cache_key] = result
+        
+        return [dict(results[cache_key]) if cache_key in results else None for cache_key in cache_keys]
+    
+    @staticmethod
+    def _openai_result(entry: Any, processing_time_ms: int) -> Optional[Dict[str, Any]]:
+        """Validated OpenAI result from one reply object, or None if its fields aren't usable"""
+        try:
+            sentiment_score = float(entry["sentiment_score"])
+            confidence_score = float(entry["confidence_score"])
+            sentiment_label = entry["sentiment_label"]
+        except (TypeError, ValueError, KeyError):
+            return None
+        if not (math.isfinite(sentiment_score) and math.isfinite(confidence_score)) or not isinstance(sentiment_label, str):
+            return None
+        
+        return {
+            "sentiment_score": sentiment_score,
+            "sentiment_label": sentiment_label,
+            "confidence_score": confidence_score,
+            "reasoning": entry.get("reasoning", ""),
+            "processing_time_ms": processing_time_ms,
+            "model_name": "openai"
+        }
+    
+    async def _fetch_openai_batch(self, processed_texts: List[str]) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """One OpenAI request scoring several preprocessed texts
+
+        Returns None if the request fails (counted by the circuit breaker), all Nones if
+        the reply doesn't line up with the texts, and None in place of any entry whose
+        fields aren't usable.
+        """
         start_time = time.time()
         
+        numbered_texts = "\n".join(f"{i}. {text}" for i, text in enumerate(processed_texts, 1))
+        prompt = f"""
+            Analyze the sentiment of each numbered financial news text below.
+            For each one, provide a sentiment score between -1 (very negative) and 1 (very positive),
+            a sentiment label (positive, negative, neutral), and a confidence score.
+            
+            Texts:
+            {numbered_texts}
+            
+            Respond in JSON format, with exactly one entry per text in the same order:
+            {{
+                "results": [
+                    {{"sentiment_score": float, "sentiment_label": "positive|negative|neutral", "confidence_score": float}}
+                ]
+            }}
+            """
+        
         try:
-            # Preprocess text
-            processed_text = self._preprocess_text(text)
+            response = await self.openai_client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are a financial sentiment analysis expert."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.1,
+                max_tokens=OPENAI_BATCH_TOKENS_PER_TEXT * len(processed_texts),
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            logger.error(f"OpenAI batch analysis failed: {e}")
+            self._record_openai_failure()
+            return None
+        
+        self._openai_failures = 0
+        try:
+            content = response.choices[0].message.content
+            entries = orjson.loads(content)["results"] if content is not None else None
+        except (orjson.JSONDecodeError, TypeError, KeyError, IndexError):
+            entries = None
+        if not isinstance(entries, list) or len(entries) != len(processed_texts):
+            logger.warning(f"OpenAI batch reply didn't match its {len(processed_texts)} texts, retrying one by one")
+            return [None] * len(processed_texts)
+        
+        # The request is shared, so attribute its time evenly across the texts
+        processing_time = int((time.time() - start_time) * 1000 / len(processed_texts))
+        
+        return [self._openai_result(entry, processing_time) for entry in entries]
+    
+    def _record_openai_failure(self) -> None:
+        """Count a failed OpenAI request, opening the circuit breaker after too many in a row"""
+        self._openai_failures += 1
+        if self._openai_failures >= settings.OPENAI_BREAKER_THRESHOLD:
+            logger.warning(
+                f"OpenAI failed {self._openai_failures} times in a row, "
+                f"skipping it for {settings.OPENAI_BREAKER_COOLDOWN:.0f}s"
+            )
+            self._openai_open_until = time.monotonic() + settings.OPENAI_BREAKER_COOLDOWN
+            self._openai_failures = 0
+    
+    async def _fetch_openai(self, cache_key: str, processed_text: str) -> Optional[Dict[str, Any]]:
+        """OpenAI result for a preprocessed text, from the shared Redis cache or the API"""
+        start_time = time.time()
+        
+        try:
+            cached = await get_cached(cache_key)
+            if cached is not None:
+                return orjson.loads(cached)
+            
+            if time.monotonic() < self._openai_open_until:
+                # API recently failing; callers fall back to FinBERT alone without waiting on a timeout
+                return None
             
             # Create prompt for sentiment analysis
             prompt = f"""
@@ -173,36 +791,37 @@ class SentimentEngine:
             """
             
             response = await self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=settings.OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a financial sentiment analysis expert."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=200
+                max_tokens=200,
+                # JSON mode guarantees a parseable object instead of prose-wrapped output
+                response_format={"type": "json_object"}
             )
             
             # Parse response
             content = response.choices[0].message.content
             if content is None:
                 return None
-                
-            import json
-            result = json.loads(content)
+            
+            result = orjson.loads(content)
             
             processing_time = (time.time() - start_time) * 1000
             
-            return {
-                "sentiment_score": result["sentiment_score"],
-                "sentiment_label": result["sentiment_label"],
-                "confidence_score": result["confidence_score"],
-                "reasoning": result.get("reasoning", ""),
-                "processing_time_ms": int(processing_time),
-                "model_name": "openai"
-            }
+            openai_result = self._openai_result(result, int(processing_time))
+            self._openai_failures = 0
+            if openai_result is None:
+                logger.warning("OpenAI reply had unusable sentiment fields, ignoring it")
+                return None
+            await set_cached(cache_key, orjson.dumps(openai_result), settings.OPENAI_CACHE_TTL)
+            return openai_result
             
         except Exception as e:
             logger.error(f"OpenAI analysis failed: {e}")
+            self._record_openai_failure()
             return None
     
     async def analyze_ensemble(self, text: str) -> Dict[str, Any]:
@@ -210,57 +829,68 @@ class SentimentEngine:
         if not self._initialized:
             await self.initialize()
         
-        # Get individual analyses
-        finbert_result = await self.analyze_finbert(text)
-        openai_result = await self.analyze_openai(text)
+        # Get individual analyses; the OpenAI round trip overlaps the FinBERT forward pass
+        finbert_result, openai_result = await asyncio.gather(
+            self.analyze_finbert(text),
+            self.analyze_openai(text)
+        )
         
+        return self._combine_ensemble(finbert_result, openai_result)
+    
+    def _combine_ensemble(self, finbert_result: Dict[str, Any], openai_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge FinBERT and OpenAI results into the ensemble result"""
+        return self._combine_ensemble_batch([finbert_result], [openai_result])[0]
+    
+    def _combine_ensemble_batch(
+        self,
+        finbert_results: List[Dict[str, Any]],
+        openai_results: List[Optional[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Merge paired FinBERT and OpenAI results, with the score math vectorized across the batch"""
         # If OpenAI failed, return enhanced FinBERT result
-        if not openai_result:
-            return finbert_result
+        combined_results: List[Dict[str, Any]] = list(finbert_results)
+        paired = [i for i, openai_result in enumerate(openai_results) if openai_result]
+        if not paired:
+            return combined_results
         
-        # Combine results with weighted average (favor FinBERT for financial text)
-        finbert_weight = 0.7
-        openai_weight = 0.3
-        
-        combined_score = (
-            finbert_result["sentiment_score"] * finbert_weight +
-            openai_result["sentiment_score"] * openai_weight
-        )
+        finbert_scores = np.array([finbert_results[i]["sentiment_score"] for i in paired], dtype=np.float64)
+        openai_scores = np.array([openai_results[i]["sentiment_score"] for i in paired], dtype=np.float64)
+        finbert_confidences = np.array([finbert_results[i]["confidence_score"] for i in paired], dtype=np.float64)
+        openai_confidences = np.array([openai_results[i]["confidence_score"] for i in paired], dtype=np.float64)
         
+        combined_scores = finbert_scores * self.FINBERT_WEIGHT + openai_scores * self.OPENAI_WEIGHT
         # Determine combined label with more granular categories
-        if combined_score > 0.4:
-            combined_label = "strongly_positive"
-        elif combined_score > 0.15:
-            combined_label = "positive"
-        elif combined_score > -0.15:
-            combined_label = "neutral"
-        elif combined_score > -0.4:
-            combined_label = "negative"
-        else:
-            combined_label = "strongly_negative"
-        
+        combined_labels = self.SCORE_LABELS[np.searchsorted(self.ENSEMBLE_BOUNDS, combined_scores, side="left")]
         # Average confidence scores
-        combined_confidence = (
-            finbert_result["confidence_score"] * finbert_weight +
-            openai_result["confidence_score"] * openai_weight
-        )
-        
+        combined_confidences = finbert_confidences * self.FINBERT_WEIGHT + openai_confidences * self.OPENAI_WEIGHT
         # Calculate sentiment strength and agreement
-        sentiment_strength = abs(combined_score)
-        model_agreement = 1.0 - abs(finbert_result["sentiment_score"] - openai_result["sentiment_score"]) / 2.0
+        strengths = np.abs(combined_scores)
+        agreements = 1.0 - np.abs(finbert_scores - openai_scores) / 2.0
         
-        return {
-            "sentiment_score": combined_score,
-            "sentiment_label": combined_label,
-            "confidence_score": combined_confidence,
-            "sentiment_strength": sentiment_strength,  # How strong the sentiment is (0-1)
-            "model_agreement": model_agreement,  # How much models agree (0-1)
-            "certainty": combined_confidence,
-            "finbert_result": finbert_result,
-            "openai_result": openai_result,
-            "model_name": "ensemble",
-            "interpretation": self._interpret_sentiment(combined_score, sentiment_strength, model_agreement)
-        }
+        for i, combined_score, combined_label, combined_confidence, sentiment_strength, model_agreement in zip(
+            paired,
+            combined_scores.tolist(),
+            combined_labels.tolist(),
+            combined_confidences.tolist(),
+            strengths.tolist(),
+            agreements.tolist()
+        ):
+            combined_results[i] = {
+                "sentiment_score": combined_score,
+                "sentiment_label": combined_label,
+                "confidence_score": combined_confidence,
+                "sentiment_strength": sentiment_strength,  # How strong the sentiment is (0-1)
+                "model_agreement": model_agreement,  # How much models agree (0-1)
+                "certainty": combined_confidence,
+                # Surface the FinBERT [CLS] embedding so callers can store it in sentiment_vector
+                "embedding_vector": finbert_results[i].get("embedding_vector"),
+                "finbert_result": finbert_results[i],
+                "openai_result": openai_results[i],
+                "model_name": "ensemble",
+                "interpretation": self._interpret_sentiment(combined_score, sentiment_strength, model_agreement)
+            }
+        
+        return combined_results
     
     def _interpret_sentiment(self, score: float, strength: float, agreement: float) -> str:
         """Generate human-readable interpretation of sentiment analysis"""
@@ -288,42 +918,90 @@ class SentimentEngine:
         if not self._initialized:
             await self.initialize()
         
-        results = []
+        results: List[Dict[str, Any]] = [{} for _ in texts]
         
         # Process in batches to avoid memory issues
         batch_size = settings.SENTIMENT_BATCH_SIZE
         
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_tasks = []
-            
-            for text in batch:
-                if model == "finbert":
-                    task = self.analyze_finbert(text)
-                elif model == "openai":
-                    task = self.analyze_openai(text)
-                else:
-                    task = self.analyze_ensemble(text)
-                batch_tasks.append(task)
-            
-            # Execute batch
-            batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
-            
-            # Handle exceptions
-            for j, result in enumerate(batch_results):
-                if isinstance(result, Exception):
-                    logger.error(f"Batch analysis failed for text {i + j}: {result}")
-                    results.append({
-                        "sentiment_score": 0.0,
-                        "sentiment_label": "neutral",
-                        "confidence_score": 0.0,
-                        "error": str(result),
-                        "model_name": model
-                    })
-                else:
-                    results.append(result)
+        # Across several chunks, group similar lengths so each FinBERT forward pass pads as little as possible
+        if model != "openai" and len(texts) > batch_size:
+            order = self._length_order(texts)
+        else:
+            order = list(range(len(texts)))
+        
+        for i in range(0, len(order), batch_size):
+            chunk = order[i:i + batch_size]
+            batch_results = await self._analyze_chunk([texts[idx] for idx in chunk], model)
+            for idx, result in zip(chunk, batch_results):
+                results[idx] = result
+        
+        return results
+    
+    async def analyze_stream(self, texts: Iterable[str], model: str = "ensemble") -> AsyncIterator[Dict[str, Any]]:
+        """Analyze texts chunk by chunk, yielding each result in input order as its chunk completes
+
+        Unlike analyze_batch, only one chunk's texts and results are held at a time, and texts may
+        come from any iterable (e.g. a streamed query), so callers can store or publish results
+        while the next chunk is being scored.
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        iterator = iter(texts)
+        while batch := list(islice(iterator, settings.SENTIMENT_BATCH_SIZE)):
+            for result in await self._analyze_chunk(batch, model):
+                yield result
+    
+    async def _analyze_chunk(self, batch: List[str], model: str) -> List[Dict[str, Any]]:
+        """Analyze one chunk with a single FinBERT forward pass and/or concurrent OpenAI calls"""
+        if model == "finbert":
+            # One forward pass for the whole chunk
+            batch_results = await self.analyze_finbert_batch(batch)
+        elif model == "openai":
+            # One OpenAI request for the whole chunk
+            try:
+                batch_results = await self.analyze_openai_batch(batch)
+            except Exception as e:
+                batch_results = [e] * len(batch)
+        else:
+            # Overlap the chunk's OpenAI request with the batched FinBERT forward pass
+            finbert_results, openai_results = await asyncio.gather(
+                self.analyze_finbert_batch(batch),
+                self.analyze_openai_batch(batch),
+                return_exceptions=True
+            )
+            if isinstance(finbert_results, Exception):
+                batch_results = [finbert_results] * len(batch)
+            else:
+                batch_results = self._combine_ensemble_batch(
+                    finbert_results,
+                    [None] * len(batch) if isinstance(openai_results, Exception) else openai_results
+                )
         
+        # Handle exceptions
+        results = []
+        for result in batch_results:
+            if isinstance(result, Exception):
+                logger.error(f"Batch analysis failed: {result}")
+                result = {
+                    "sentiment_score": 0.0,
+                    "sentiment_label": "neutral",
+                    "confidence_score": 0.0,
+                    "error": str(result),
+                    "model_name": model
+                }
+            results.append(result)
         return results
+    
+    def _length_order(self, texts: List[str]) -> List[int]:
+        """Indices of texts sorted by token count (character count if the tokenizer isn't loaded)"""
+        processed_texts = [self._preprocess_text(text) for text in texts]
+        if self.finbert_tokenizer is not None:
+            # Goes through the token-id cache, so the forward pass reuses these encodings
+            lengths = [len(token_ids) for token_ids in self._token_ids(processed_texts)]
+        else:
+            lengths = [len(text) for text in processed_texts]
+        return sorted(range(len(texts)), key=lengths.__getitem__)
 
 
 # Global sentiment engine instance
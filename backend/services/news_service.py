@@ -1,23 +1,106 @@
 import asyncio
 import httpx
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 from config import settings
 from models.news_models import NewsArticle
+from database import INGEST_LOCK_QUERY
 from sentiment.sentiment_engine import sentiment_engine
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-import json
+from sqlalchemy import select, and_, bindparam, Integer
+from sqlalchemy.orm import defer
+from pgvector.sqlalchemy import Vector
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per server-side cursor round trip for streamed queries
+TRENDS_YIELD_PER = 256
+
+# Feed fields kept in raw_data; title, summary, url, source and authors already have their own columns
+RAW_DATA_KEYS = ("time_published", "ticker_sentiment", "topics", "overall_sentiment_score", "overall_sentiment_label")
+
+
+def slim_raw_data(article_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a feed item with only the fields worth storing in raw_data"""
+    return {key: article_data[key] for key in RAW_DATA_KEYS if key in article_data}
+
+
+def parse_av_timestamp(value: str) -> datetime:
+    """Parse an Alpha Vantage time_published value as a naive UTC datetime
+
+    The feed uses the compact YYYYMMDDTHHMMSS form, which is sliced directly;
+    anything else goes through the general ISO parser. Naive like utc_cutoff,
+    to match the TIMESTAMP columns.
+    """
+    if len(value) == 15 and value[8] == "T":
+        return datetime(
+            int(value[0:4]), int(value[4:6]), int(value[6:8]),
+            int(value[9:11]), int(value[11:13]), int(value[13:15])
+        )
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        # Offset-less values are already UTC
+        return parsed
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+# Listings never serialize the embedding or the feed payload; leave the 768-float vector and JSONB on the server
+LISTING_LOAD_OPTIONS = (defer(NewsArticle.sentiment_vector), defer(NewsArticle.raw_data))
+
+# Base statements built once at import; requests only bind :cutoff (plus ticker/limit)
+_RECENT_ARTICLES_QUERY = select(NewsArticle).options(*LISTING_LOAD_OPTIONS).where(
+    and_(
+        NewsArticle.published_at >= bindparam("cutoff"),
+        NewsArticle.is_processed == True
+    )
+).order_by(NewsArticle.published_at.desc())
+
+# Only the columns the trends payload uses; rows come back as plain tuples without ORM hydration
+_SENTIMENT_TRENDS_QUERY = select(
+    NewsArticle.published_at,
+    NewsArticle.sentiment_score,
+    NewsArticle.sentiment_label,
+    NewsArticle.title,
+    NewsArticle.ticker_symbol
+).where(
+    and_(
+        NewsArticle.published_at >= bindparam("cutoff"),
+        NewsArticle.sentiment_score.isnot(None),
+        NewsArticle.is_processed == True
+    )
+)
+
+_EXISTING_URLS_QUERY = select(NewsArticle.url).where(NewsArticle.url.in_(bindparam("urls", expanding=True)))
+
+# Ranks a text-search candidate set by embedding distance; exact distances over a few dozen rows,
+# computed in Postgres so the vectors never come back. Candidates without an embedding sort last
+_SIMILAR_ARTICLES_QUERY = select(NewsArticle).options(*LISTING_LOAD_OPTIONS).where(
+    NewsArticle.id.in_(bindparam("ids", expanding=True))
+).order_by(
+    NewsArticle.sentiment_vector.cosine_distance(bindparam("query_vector", type_=Vector(768))).asc().nulls_last(),
+    NewsArticle.published_at.desc()
+).limit(bindparam("limit", type_=Integer))
+
+
+def utc_cutoff(hours: int) -> datetime:
+    """Start of a look-back window as naive UTC, matching the TIMESTAMP columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+
 
 class NewsService:
     def __init__(self):
         self.api_key = settings.ALPHA_VANTAGE_API_KEY
         self.base_url = "https://www.alphavantage.co/query"
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # One pooled client for the process; HTTP/2 multiplexes concurrent Alpha Vantage calls over one connection
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
         
     async def __aenter__(self):
         return self
@@ -46,7 +129,7 @@ class NewsService:
             response = await self.client.get(self.base_url, params=params)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             
             if "feed" not in data:
                 logger.warning("No news feed found in response")
@@ -75,7 +158,7 @@ class NewsService:
             response = await self.client.get(self.base_url, params=params)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             
             if "feed" not in data:
                 logger.warning(f"No news found for symbol {symbol}")
@@ -87,6 +170,11 @@ class NewsService:
             logger.error(f"Failed to fetch company news for {symbol}: {e}")
             return []
     
+    async def fetch_many_companies(self, symbols: List[str], limit: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch company-specific news for several symbols concurrently"""
+        feeds = await asyncio.gather(*(self.fetch_company_news(symbol, limit) for symbol in symbols))
+        return dict(zip(symbols, feeds))
+    
     def _parse_news_article(self, article_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Parse Alpha Vantage news article data"""
         try:
@@ -101,8 +189,8 @@ class NewsService:
                 "url": article_data.get("url", ""),
                 "source": article_data.get("source", ""),
                 "author": authors,
-                "published_at": datetime.fromisoformat(article_data.get("time_published", "").replace("Z", "+00:00")),
-                "raw_data": article_data
+                "published_at": parse_av_timestamp(article_data.get("time_published", "")),
+                "raw_data": slim_raw_data(article_data)
             }
             
             # Extract ticker information
@@ -131,55 +219,84 @@ class NewsService:
     
     async def process_and_store_articles(self, db: AsyncSession, articles_data: List[Dict[str, Any]]) -> List[NewsArticle]:
         """Process articles and store them in the database"""
-        processed_articles = []
+        parsed_articles = []
+        seen_urls = set()
         
         for article_data in articles_data:
-            try:
-                # Parse article data
-                parsed_article = self._parse_news_article(article_data)
-                if not parsed_article:
-                    continue
-                
-                # Check if article already exists
-                existing = await db.execute(
-                    select(NewsArticle).where(NewsArticle.url == parsed_article["url"])
-                )
-                if existing.scalar_one_or_none():
-                    logger.debug(f"Article already exists: {parsed_article['title'][:50]}...")
-                    continue
-                
-                # Create new article
-                article = NewsArticle(**parsed_article)
-                
-                # Perform sentiment analysis
-                if article.content is not None:
-                    sentiment_result = await sentiment_engine.analyze_ensemble(str(article.content))
-                    
-                    if sentiment_result:
-                        article.sentiment_score = sentiment_result["sentiment_score"]
-                        article.sentiment_label = sentiment_result["sentiment_label"]
-                        article.confidence_score = sentiment_result["confidence_score"]
-                        
-                        # Store embedding if available
-                        if "embedding_vector" in sentiment_result and sentiment_result["embedding_vector"]:
-                            article.sentiment_vector = sentiment_result["embedding_vector"]
-                        
-                        setattr(article, 'is_processed', True)
-                
-                # Add to database
-                db.add(article)
-                await db.commit()
-                await db.refresh(article)
-                
-                processed_articles.append(article)
-                logger.info(f"Processed and stored article: {article.title[:50]}...")
-                
-            except Exception as e:
-                logger.error(f"Failed to process article: {e}")
-                await db.rollback()
+            # Parse article data
+            parsed_article = self._parse_news_article(article_data)
+            if not parsed_article or parsed_article["url"] in seen_urls:
                 continue
+            seen_urls.add(parsed_article["url"])
+            parsed_articles.append(parsed_article)
         
-        return processed_articles
+        if not parsed_articles:
+            return []
+        
+        try:
+            # Check which articles already exist in one round trip
+            existing = await db.execute(_EXISTING_URLS_QUERY, {"urls": list(seen_urls)})
+            stored_urls = set(existing.scalars().all())
+            new_articles = [
+                NewsArticle(**parsed_article)
+                for parsed_article in parsed_articles
+                if parsed_article["url"] not in stored_urls
+            ]
+            logger.debug(f"Skipping {len(parsed_articles) - len(new_articles)} articles that already exist")
+            
+            if not new_articles:
+                return []
+            
+            # Perform sentiment analysis for all new articles at once: FinBERT runs batched forwards
+            # and the OpenAI requests overlap, instead of one article at a time
+            to_score = [article for article in new_articles if article.content is not None]
+            if to_score:
+                sentiment_results = await sentiment_engine.analyze_batch([str(article.content) for article in to_score], model="ensemble")
+                
+                for article, sentiment_result in zip(to_score, sentiment_results):
+                    # Failed analyses stay unprocessed so they can be reprocessed later
+                    if not sentiment_result or "error" in sentiment_result:
+                        continue
+                    
+                    article.sentiment_score = sentiment_result["sentiment_score"]
+                    article.sentiment_label = sentiment_result["sentiment_label"]
+                    article.confidence_score = sentiment_result["confidence_score"]
+                    
+                    # Store embedding if available
+                    if sentiment_result.get("embedding_vector") is not None:
+                        article.sentiment_vector = sentiment_result["embedding_vector"]
+                    
+                    setattr(article, 'is_processed', True)
+            
+            # Same advisory lock as the Celery ingest, then drop anything stored while we were scoring;
+            # url can't be unique on the hypertable, so this is what keeps overlapping fetches from duplicating
+            await db.execute(INGEST_LOCK_QUERY)
+            existing = await db.execute(_EXISTING_URLS_QUERY, {"urls": [article.url for article in new_articles]})
+            stored_urls = set(existing.scalars().all())
+            if stored_urls:
+                new_articles = [article for article in new_articles if article.url not in stored_urls]
+                if not new_articles:
+                    await db.commit()
+                    return []
+            
+            # Add to database: one batched INSERT and a single commit for the whole feed
+            db.add_all(new_articles)
+            await db.commit()
+            
+            # Load server-generated columns for every new row with one SELECT instead of a refresh per article
+            await db.execute(
+                select(NewsArticle)
+                .where(NewsArticle.id.in_([article.id for article in new_articles]))
+                .execution_options(populate_existing=True)
+            )
+            
+            logger.info(f"Processed and stored {len(new_articles)} articles")
+            return new_articles
+            
+        except Exception as e:
+            logger.error(f"Failed to process articles: {e}")
+            await db.rollback()
+            return []
     
     async def fetch_and_process_news(self, db: AsyncSession, tickers: Optional[List[str]] = None, topics: Optional[List[str]] = None) -> List[NewsArticle]:
         """Fetch news from Alpha Vantage and process it"""
@@ -196,22 +313,32 @@ class NewsService:
         logger.info(f"Successfully processed {len(processed_articles)} articles")
         return processed_articles
     
-    async def get_recent_articles(self, db: AsyncSession, hours: int = 24, ticker: Optional[str] = None) -> List[NewsArticle]:
+    async def fetch_and_process_companies(self, db: AsyncSession, symbols: List[str], limit: int = 50) -> List[NewsArticle]:
+        """Fetch each symbol's news concurrently and process feeds as they arrive"""
+        # Scoring and storing one feed overlaps the remaining HTTP requests; the session handles one feed at a time
+        fetches = [asyncio.ensure_future(self.fetch_company_news(symbol, limit)) for symbol in symbols]
+        processed_articles = []
+        
+        for fetch in asyncio.as_completed(fetches):
+            articles_data = await fetch
+            if articles_data:
+                processed_articles.extend(await self.process_and_store_articles(db, articles_data))
+        
+        logger.info(f"Successfully processed {len(processed_articles)} articles for {len(symbols)} symbols")
+        return processed_articles
+    
+    async def get_recent_articles(self, db: AsyncSession, hours: int = 24, ticker: Optional[str] = None, limit: Optional[int] = None) -> List[NewsArticle]:
         """Get recent articles from the database"""
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            
-            query = select(NewsArticle).where(
-                and_(
-                    NewsArticle.published_at >= cutoff_time,
-                    NewsArticle.is_processed == True
-                )
-            ).order_by(NewsArticle.published_at.desc())
+            query = _RECENT_ARTICLES_QUERY
             
             if ticker:
                 query = query.where(NewsArticle.ticker_symbol == ticker)
             
-            result = await db.execute(query)
+            if limit is not None:
+                query = query.limit(limit)
+            
+            result = await db.execute(query, {"cutoff": utc_cutoff(hours)})
             articles = result.scalars().all()
             
             return list(articles)
@@ -220,17 +347,27 @@ class NewsService:
             logger.error(f"Failed to get recent articles: {e}")
             return []
     
-    async def search_similar_articles(self, db: AsyncSession, query_vector: List[float], limit: int = 10) -> List[NewsArticle]:
-        """Search for articles similar to the given vector"""
+    async def search_similar_articles(
+        self,
+        db: AsyncSession,
+        query_vector: List[float],
+        candidate_ids: List[Any],
+        limit: int = 10
+    ) -> List[NewsArticle]:
+        """Order text-search candidates by how close their embedding is to the query's
+
+        The candidates come from full-text or trigram search, so every result matches the
+        query's words; the FinBERT embedding only decides the order among them.
+        """
+        if not candidate_ids:
+            return []
+        
         try:
             # Use pgvector cosine similarity
-            query = select(NewsArticle).where(
-                NewsArticle.sentiment_vector.isnot(None)
-            ).order_by(
-                NewsArticle.sentiment_vector.cosine_distance(query_vector)
-            ).limit(limit)
-            
-            result = await db.execute(query)
+            result = await db.execute(
+                _SIMILAR_ARTICLES_QUERY,
+                {"ids": candidate_ids, "query_vector": query_vector, "limit": limit}
+            )
             articles = result.scalars().all()
             
             return list(articles)
@@ -242,48 +379,39 @@ class NewsService:
     async def get_sentiment_trends(self, db: AsyncSession, ticker: Optional[str] = None, hours: int = 24) -> Dict[str, Any]:
         """Get sentiment trends over time"""
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            
-            query = select(NewsArticle).where(
-                and_(
-                    NewsArticle.published_at >= cutoff_time,
-                    NewsArticle.sentiment_score.isnot(None),
-                    NewsArticle.is_processed == True
-                )
-            )
+            query = _SENTIMENT_TRENDS_QUERY
             
             if ticker:
                 query = query.where(NewsArticle.ticker_symbol == ticker)
             
-            result = await db.execute(query)
-            articles = result.scalars().all()
-            
-            if not articles:
-                return {"trends": [], "summary": {}}
-            
-            # Calculate trends
-            sentiment_scores = [article.sentiment_score for article in articles]
-            avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
+            # The window is unbounded, so stream rows through a server-side cursor
+            result = await db.stream(
+                query.execution_options(yield_per=TRENDS_YIELD_PER),
+                {"cutoff": utc_cutoff(hours)}
+            )
             
-            # Count sentiment labels
+            # Build trends and summary in a single pass
+            trends = []
+            sentiment_total = 0.0
             sentiment_counts = {}
-            for article in articles:
-                label = article.sentiment_label
+            async for published_at, sentiment_score, label, title, ticker_symbol in result:
+                trends.append({
+                    "published_at": published_at.isoformat(),
+                    "sentiment_score": sentiment_score,
+                    "title": title,
+                    "ticker": ticker_symbol
+                })
+                sentiment_total += sentiment_score
                 sentiment_counts[label] = sentiment_counts.get(label, 0) + 1
             
+            if not trends:
+                return {"trends": [], "summary": {}}
+            
             return {
-                "trends": [
-                    {
-                        "published_at": article.published_at.isoformat(),
-                        "sentiment_score": article.sentiment_score,
-                        "title": article.title,
-                        "ticker": article.ticker_symbol
-                    }
-                    for article in articles
-                ],
+                "trends": trends,
                 "summary": {
-                    "total_articles": len(articles),
-                    "average_sentiment": avg_sentiment,
+                    "total_articles": len(trends),
+                    "average_sentiment": sentiment_total / len(trends),
                     "sentiment_distribution": sentiment_counts
                 }
             }
@@ -0,0 +1,87 @@
+import pytest
+import orjson
+from unittest.mock import Mock, patch, AsyncMock
+from database import NEWS_HOURLY_REFRESH_HOURS
+from routers import news as news_router
+
+
+def _stats_row():
+    return Mock(total_articles=4, processed_articles=3, avg_sentiment=0.25,
+                top_tickers=[{"ticker": "AAPL", "count": 4}])
+
+
+class TestNewsStats:
+    """Test cases for the /stats endpoint"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("hours,source", [
+        (24, "hourly"),
+        (NEWS_HOURLY_REFRESH_HOURS, "hourly"),
+        (NEWS_HOURLY_REFRESH_HOURS + 1, "raw"),
+        (24 * 30, "raw"),
+    ])
+    async def test_stats_source_by_window(self, hours, source):
+        """Windows past the aggregate's refresh horizon are counted from the raw hypertable"""
+        db = Mock()
+        db.execute = AsyncMock(return_value=Mock(one=Mock(return_value=_stats_row())))
+
+        with patch.object(news_router, "get_cached", AsyncMock(return_value=None)), \
+             patch.object(news_router, "set_cached", AsyncMock()):
+            response = await news_router.get_news_stats(hours=hours, db=db)
+
+        statement = db.execute.call_args[0][0]
+        assert statement is news_router._STATS_QUERIES[source]
+        if source == "raw":
+            assert "FROM news_articles" in str(statement)
+            assert "news_hourly" not in str(statement)
+
+        body = orjson.loads(response.body)
+        assert body["total_articles"] == 4
+        assert body["processing_rate"] == 75.0
+        assert body["time_window_hours"] == hours
+
+
+class TestNewsListing:
+    """Test cases for cached listings and their ETags"""
+
+    @staticmethod
+    def _request(if_none_match=None):
+        headers = {"if-none-match": if_none_match} if if_none_match else {}
+        return Mock(headers=headers)
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_signature(self):
+        """A cached listing is served with its stored ETag without touching the database"""
+        db = Mock()
+        db.execute = AsyncMock()
+        cached = b'"abc"\n[{"id": 1}]'
+
+        with patch.object(news_router, "get_cached", AsyncMock(return_value=cached)):
+            response = await news_router._cached_listing(self._request(), db, "news:list:None:24:50", 24, None, 50)
+            not_modified = await news_router._cached_listing(self._request('"abc"'), db, "news:list:None:24:50", 24, None, 50)
+
+        db.execute.assert_not_called()
+        assert response.body == b'[{"id": 1}]'
+        assert response.headers["etag"] == '"abc"'
+        assert not_modified.status_code == 304
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("ticker,statement", [
+        (None, "_LIST_SIGNATURE_QUERY"),
+        ("AAPL", "_TICKER_SIGNATURE_QUERY"),
+    ])
+    async def test_cache_miss_stores_etag_with_body(self, ticker, statement):
+        """On a miss the signature picks the statement matching the ticker filter and is cached with the body"""
+        db = Mock()
+        row = Mock(latest=None, total=0, score_sum=None)
+        db.execute = AsyncMock(return_value=Mock(one=Mock(return_value=row)))
+        set_cached = AsyncMock()
+
+        with patch.object(news_router, "get_cached", AsyncMock(return_value=None)), \
+             patch.object(news_router, "set_cached", set_cached), \
+             patch.object(news_router.news_service, "get_recent_articles", AsyncMock(return_value=[])):
+            response = await news_router._cached_listing(self._request(), db, "news:list", 24, ticker, 50)
+
+        assert db.execute.call_args[0][0] is getattr(news_router, statement)
+        etag = response.headers["etag"]
+        assert set_cached.call_args[0][1] == etag.encode() + b"\n" + response.body
@@ -1,10 +1,25 @@
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime
-from services.news_service import NewsService
+from services.news_service import NewsService, parse_av_timestamp, TRENDS_YIELD_PER
 from models.news_models import NewsArticle
 
 
+class AsyncIterator:
+    """Minimal async iterable standing in for a streamed SQLAlchemy result"""
+    def __init__(self, items):
+        self._items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
 @pytest.fixture
 def news_service():
     return NewsService()
@@ -38,7 +53,7 @@ async def test_fetch_news_sentiment_success(news_service):
     """Test successful news sentiment fetching"""
     with patch.object(news_service.client, 'get') as mock_get:
         mock_response = Mock()
-        mock_response.json.return_value = {"feed": [{"title": "Test"}]}
+        mock_response.content = b'{"feed": [{"title": "Test"}]}'
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
         
@@ -82,6 +97,19 @@ async def test_parse_news_article(news_service, mock_article_data):
     assert result["alpha_vantage_sentiment"] == 0.8
     assert "technology" in result["keywords"]
     assert "earnings" in result["keywords"]
+    # Fields that already have columns aren't duplicated into raw_data
+    assert "summary" not in result["raw_data"]
+    assert result["raw_data"]["ticker_sentiment"] == mock_article_data["ticker_sentiment"]
+
+
+def test_parse_av_timestamp():
+    """Test compact and ISO Alpha Vantage timestamps parse to the same naive UTC datetime"""
+    expected = datetime(2024, 1, 1, 10, 0, 0)
+    
+    assert parse_av_timestamp("20240101T100000") == expected
+    assert parse_av_timestamp("2024-01-01T10:00:00Z") == expected
+    assert parse_av_timestamp("2024-01-01T12:00:00+02:00") == expected
+    assert parse_av_timestamp("20240101T100000").tzinfo is None
 
 
 @pytest.mark.asyncio
@@ -113,59 +141,62 @@ async def test_get_recent_articles(news_service):
         )
     ]
     
-    with patch('services.news_service.select') as mock_select, \
-         patch('services.news_service.and_') as mock_and:
-        
-        mock_query = Mock()
-        mock_select.return_value = mock_query
-        mock_and.return_value = Mock()
-        
-        mock_db.execute.return_value = Mock()
-        mock_db.execute.return_value.scalars.return_value.all.return_value = mock_articles
-        
-        result = await news_service.get_recent_articles(mock_db, hours=24, ticker="AAPL")
-        
-        assert len(result) == 1
-        assert result[0].title == "Test Article"
+    mock_db.execute.return_value = Mock()
+    mock_db.execute.return_value.scalars.return_value.all.return_value = mock_articles
+    
+    result = await news_service.get_recent_articles(mock_db, hours=24, ticker="AAPL")
+    
+    assert len(result) == 1
+    assert result[0].title == "Test Article"
+    
+    # The ticker filter is added to the prebuilt statement; the window is bound as :cutoff
+    statement, params = mock_db.execute.call_args[0]
+    assert "news_articles.ticker_symbol = " in str(statement)
+    assert "AAPL" in statement.compile().params.values()
+    assert params["cutoff"] < datetime.utcnow()
+
+
+@pytest.mark.asyncio
+async def test_get_recent_articles_pushes_limit_into_query(news_service):
+    """Test that the limit is applied in SQL rather than by slicing"""
+    mock_db = AsyncMock()
+    
+    mock_db.execute.return_value = Mock()
+    mock_db.execute.return_value.scalars.return_value.all.return_value = []
+    
+    await news_service.get_recent_articles(mock_db, hours=24, limit=25)
+    
+    statement, params = mock_db.execute.call_args[0]
+    assert "LIMIT" in str(statement)
+    assert 25 in statement.compile().params.values()
+    assert "cutoff" in params
 
 
 @pytest.mark.asyncio
 async def test_get_sentiment_trends(news_service):
     """Test getting sentiment trends"""
     mock_db = AsyncMock()
-    mock_articles = [
-        Mock(
-            published_at=datetime.utcnow(),
-            sentiment_score=0.5,
-            sentiment_label="positive",
-            title="Test Article",
-            ticker_symbol="AAPL"
-        ),
-        Mock(
-            published_at=datetime.utcnow(),
-            sentiment_score=-0.3,
-            sentiment_label="negative",
-            title="Test Article 2",
-            ticker_symbol="TSLA"
-        )
+    # (published_at, sentiment_score, sentiment_label, title, ticker_symbol) rows
+    mock_rows = [
+        (datetime.utcnow(), 0.5, "positive", "Test Article", "AAPL"),
+        (datetime.utcnow(), -0.3, "negative", "Test Article 2", "TSLA")
     ]
     
-    with patch('services.news_service.select') as mock_select, \
-         patch('services.news_service.and_') as mock_and:
-        
-        mock_query = Mock()
-        mock_select.return_value = mock_query
-        mock_and.return_value = Mock()
-        
-        mock_db.execute.return_value = Mock()
-        mock_db.execute.return_value.scalars.return_value.all.return_value = mock_articles
-        
-        result = await news_service.get_sentiment_trends(mock_db, ticker="AAPL", hours=24)
-        
-        assert "trends" in result
-        assert "summary" in result
-        assert result["summary"]["total_articles"] == 2
-        assert result["summary"]["average_sentiment"] == 0.1  # (0.5 + (-0.3)) / 2
+    mock_db.stream.return_value = AsyncIterator(mock_rows)
+    
+    result = await news_service.get_sentiment_trends(mock_db, ticker="AAPL", hours=24)
+    
+    assert "trends" in result
+    assert "summary" in result
+    assert result["summary"]["total_articles"] == 2
+    assert result["summary"]["average_sentiment"] == 0.1  # (0.5 + (-0.3)) / 2
+    
+    # Rows are streamed through a server-side cursor from the ticker-filtered statement
+    statement, params = mock_db.stream.call_args[0]
+    assert "news_articles.ticker_symbol = " in str(statement)
+    assert "AAPL" in statement.compile().params.values()
+    assert statement.get_execution_options()["yield_per"] == TRENDS_YIELD_PER
+    assert "cutoff" in params
 
 
 @pytest.mark.asyncio
@@ -189,17 +220,28 @@ async def test_search_similar_articles(news_service):
         )
     ]
     
-    with patch('services.news_service.select') as mock_select:
-        mock_query = Mock()
-        mock_select.return_value = mock_query
-        
-        mock_db.execute.return_value = Mock()
-        mock_db.execute.return_value.scalars.return_value.all.return_value = mock_articles
-        
-        result = await news_service.search_similar_articles(mock_db, query_vector, limit=10)
-        
-        assert len(result) == 1
-        assert result[0].title == "Similar Article"
+    mock_db.execute.return_value = Mock()
+    mock_db.execute.return_value.scalars.return_value.all.return_value = mock_articles
+    
+    result = await news_service.search_similar_articles(mock_db, query_vector, ["1", "2"], limit=10)
+    
+    assert len(result) == 1
+    assert result[0].title == "Similar Article"
+    
+    # Only the text-search candidates are ranked
+    statement, params = mock_db.execute.call_args[0]
+    assert params["ids"] == ["1", "2"]
+    assert params["query_vector"] == query_vector
+    assert "<=>" in str(statement)
+
+
+@pytest.mark.asyncio
+async def test_search_similar_articles_without_candidates(news_service):
+    """Test an empty candidate set returns nothing without querying"""
+    mock_db = AsyncMock()
+    
+    assert await news_service.search_similar_articles(mock_db, [0.1] * 768, [], 10) == []
+    mock_db.execute.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -216,6 +258,46 @@ async def test_fetch_and_process_news(news_service):
         assert result == []
 
 
+@pytest.mark.asyncio
+async def test_process_and_store_articles_rechecks_urls_under_ingest_lock(news_service, mock_article_data):
+    """Test the insert takes the shared ingest lock and skips URLs stored by a concurrent fetch"""
+    mock_db = AsyncMock()
+    mock_db.add_all = Mock()
+    
+    def url_result(urls):
+        result = Mock()
+        result.scalars.return_value.all.return_value = urls
+        return result
+    
+    # URL lookup, advisory lock, re-check under the lock (a concurrent fetch stored the story meanwhile)
+    mock_db.execute.side_effect = [url_result([]), Mock(), url_result(["https://example.com/test"])]
+    
+    with patch('services.news_service.sentiment_engine.analyze_batch', AsyncMock(return_value=[{"error": "skip"}])):
+        result = await news_service.process_and_store_articles(mock_db, [mock_article_data])
+    
+    assert result == []
+    assert "pg_advisory_xact_lock" in str(mock_db.execute.call_args_list[1].args[0])
+    mock_db.add_all.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_process_companies(news_service):
+    """Test per-symbol feeds are fetched concurrently and each one is processed"""
+    mock_db = AsyncMock()
+    feeds = {"AAPL": [{"title": "Apple"}], "MSFT": [], "TSLA": [{"title": "Tesla"}]}
+    
+    async def fake_fetch(symbol, limit):
+        return feeds[symbol]
+    
+    with patch.object(news_service, 'fetch_company_news', side_effect=fake_fetch), \
+         patch.object(news_service, 'process_and_store_articles', return_value=[Mock()]) as mock_process:
+        
+        result = await news_service.fetch_and_process_companies(mock_db, ["AAPL", "MSFT", "TSLA"])
+        
+        assert len(result) == 2
+        assert mock_process.call_count == 2
+
+
 @pytest.mark.asyncio
 async def test_fetch_and_process_news_no_data(news_service):
     """Test fetching and processing news with no data"""
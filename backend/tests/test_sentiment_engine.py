@@ -1,7 +1,13 @@
 import pytest
 import asyncio
+import threading
+import time
+import httpx
+import numpy as np
+import orjson
+import torch
 from unittest.mock import Mock, patch, AsyncMock
-from sentiment.sentiment_engine import SentimentEngine
+from sentiment.sentiment_engine import SentimentEngine, MAX_INPUT_CHARS
 
 
 @pytest.fixture
@@ -25,6 +31,122 @@ async def test_initialize_sentiment_engine(sentiment_engine):
         assert sentiment_engine._initialized is True
         assert sentiment_engine.finbert_tokenizer is not None
         assert sentiment_engine.finbert_model is not None
+        # Inference-only setup: dropout off and no autograd state on the weights
+        mock_model.return_value.eval.assert_called_once()
+        mock_model.return_value.requires_grad_.assert_called_once_with(False)
+
+
+def test_initialize_sync_loads_once_across_threads(sentiment_engine):
+    """Test concurrent initialize_sync calls load the models a single time"""
+    def slow_load(*args, **kwargs):
+        time.sleep(0.05)
+        return Mock()
+    
+    with patch('sentiment.sentiment_engine.AutoTokenizer.from_pretrained'), \
+         patch('sentiment.sentiment_engine.AutoModelForSequenceClassification.from_pretrained',
+               side_effect=slow_load) as mock_model, \
+         patch.object(sentiment_engine, '_warmup'):
+        threads = [threading.Thread(target=sentiment_engine.initialize_sync) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    assert sentiment_engine._initialized is True
+    mock_model.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_initialize_loads_with_low_cpu_mem_usage(sentiment_engine):
+    """Test FinBERT weights are streamed in, kept FP32 on CPU and loaded in half precision on CUDA"""
+    sentiment_engine.device = torch.device("cpu")
+    
+    with patch('sentiment.sentiment_engine.AutoTokenizer.from_pretrained'), \
+         patch('sentiment.sentiment_engine.AutoModelForSequenceClassification.from_pretrained') as mock_model, \
+         patch('sentiment.sentiment_engine.settings.FINBERT_PRECISION', 'fp32'):
+        await sentiment_engine.initialize()
+    
+    assert mock_model.call_args.kwargs == {"low_cpu_mem_usage": True, "torch_dtype": None}
+    
+    sentiment_engine.device = torch.device("cuda")
+    with patch('sentiment.sentiment_engine.settings.FINBERT_PRECISION', 'fp16'):
+        assert sentiment_engine._load_dtype() == torch.float16
+    with patch('sentiment.sentiment_engine.settings.FINBERT_PRECISION', 'bf16'):
+        assert sentiment_engine._load_dtype() == torch.bfloat16
+
+
+@pytest.mark.asyncio
+async def test_initialize_moves_model_to_cuda_when_available():
+    """Test the model is placed on CUDA when a GPU is present and inputs are copied asynchronously"""
+    with patch('sentiment.sentiment_engine.torch.cuda.is_available', return_value=True):
+        engine = SentimentEngine()
+    
+    with patch('sentiment.sentiment_engine.AutoTokenizer.from_pretrained'), \
+         patch('sentiment.sentiment_engine.AutoModelForSequenceClassification.from_pretrained') as mock_model, \
+         patch('sentiment.sentiment_engine.settings.FINBERT_PRECISION', 'fp32'), \
+         patch.object(engine, '_warmup', return_value=True):
+        await engine.initialize()
+    
+    mock_model.return_value.to.assert_called_with(torch.device("cuda"))
+    
+    tensor = Mock()
+    engine._to_device({"input_ids": tensor})
+    tensor.pin_memory.return_value.to.assert_called_once_with(torch.device("cuda"), non_blocking=True)
+
+
+@pytest.mark.asyncio
+async def test_initialize_uses_http2_client(sentiment_engine):
+    """Test the OpenAI client shares one pooled HTTP/2 connection pool, closed by aclose"""
+    with patch('sentiment.sentiment_engine.AutoTokenizer.from_pretrained'), \
+         patch('sentiment.sentiment_engine.AutoModelForSequenceClassification.from_pretrained'), \
+         patch('sentiment.sentiment_engine.settings.OPENAI_API_KEY', 'test-key'), \
+         patch('sentiment.sentiment_engine.httpx.AsyncClient', wraps=httpx.AsyncClient) as mock_client, \
+         patch('sentiment.sentiment_engine.openai.AsyncOpenAI') as mock_openai:
+        
+        await sentiment_engine.initialize()
+        
+        assert mock_client.call_args.kwargs['http2'] is True
+        http_client = mock_openai.call_args.kwargs['http_client']
+        assert isinstance(http_client, httpx.AsyncClient)
+        
+        await sentiment_engine.aclose()
+        assert http_client.is_closed
+        assert sentiment_engine.openai_client is None
+
+
+@pytest.mark.asyncio
+async def test_initialize_compiles_model(sentiment_engine):
+    """Test FINBERT_COMPILE compiles the loaded model once and warms it up"""
+    with patch('sentiment.sentiment_engine.AutoTokenizer.from_pretrained', return_value=Mock()), \
+         patch('sentiment.sentiment_engine.AutoModelForSequenceClassification.from_pretrained') as mock_model, \
+         patch('sentiment.sentiment_engine.settings.FINBERT_COMPILE', True), \
+         patch('sentiment.sentiment_engine.settings.FINBERT_PRECISION', 'fp32'), \
+         patch('sentiment.sentiment_engine.torch.compile') as mock_compile, \
+         patch.object(sentiment_engine, '_warmup', return_value=True) as mock_warmup:
+        await sentiment_engine.initialize()
+    
+    mock_compile.assert_called_once_with(mock_model.return_value, mode='default', dynamic=True)
+    assert sentiment_engine.finbert_model is mock_compile.return_value
+    mock_warmup.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_initialize_quantizes_on_cpu(sentiment_engine):
+    """Test INT8 precision on CPU quantizes the Linear layers and skips torch.compile"""
+    sentiment_engine.device = torch.device("cpu")
+    
+    with patch('sentiment.sentiment_engine.AutoTokenizer.from_pretrained', return_value=Mock()), \
+         patch('sentiment.sentiment_engine.AutoModelForSequenceClassification.from_pretrained') as mock_model, \
+         patch('sentiment.sentiment_engine.settings.FINBERT_PRECISION', 'int8'), \
+         patch('sentiment.sentiment_engine.settings.FINBERT_COMPILE', True), \
+         patch('sentiment.sentiment_engine.torch.quantization.quantize_dynamic') as mock_quantize, \
+         patch('sentiment.sentiment_engine.torch.compile') as mock_compile, \
+         patch.object(sentiment_engine, '_warmup', return_value=True):
+        await sentiment_engine.initialize()
+    
+    mock_quantize.assert_called_once_with(mock_model.return_value, {torch.nn.Linear}, dtype=torch.qint8)
+    assert sentiment_engine.finbert_model is mock_quantize.return_value
+    mock_compile.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -35,15 +157,18 @@ async def test_preprocess_text(sentiment_engine):
     processed = sentiment_engine._preprocess_text(text)
     assert processed == text
     
-    # Test long text truncation
-    long_text = "A" * 1000
+    # Test long text truncation; FinBERT's token truncation does the real cut
+    long_text = "A" * 10000
     processed = sentiment_engine._preprocess_text(long_text)
-    assert len(processed) <= 512
+    assert len(processed) <= MAX_INPUT_CHARS
+    assert len(sentiment_engine._preprocess_text("A" * 1000)) == 1000
     
     # Test whitespace handling
     text_with_whitespace = "   Test text with spaces   "
     processed = sentiment_engine._preprocess_text(text_with_whitespace)
     assert processed == "Test text with spaces"
+    assert sentiment_engine._preprocess_text("a\t\nb") == "a b"
+    assert sentiment_engine._preprocess_text("Shares  rose\n\nafter earnings") == "Shares rose after earnings"
 
 
 @pytest.mark.asyncio
@@ -90,6 +215,122 @@ async def test_analyze_openai(sentiment_engine):
         assert result['model_name'] == 'openai'
 
 
+@pytest.mark.asyncio
+async def test_analyze_openai_cache_hit(sentiment_engine):
+    """Test cached OpenAI results skip the API call"""
+    sentiment_engine.openai_client = Mock()
+    sentiment_engine.openai_client.chat.completions.create = AsyncMock()
+    cached = b'{"sentiment_score": 0.8, "sentiment_label": "positive", "confidence_score": 0.9, "model_name": "openai"}'
+    
+    with patch('sentiment.sentiment_engine.get_cached', AsyncMock(return_value=cached)):
+        result = await sentiment_engine.analyze_openai("Positive financial news")
+    
+    assert result['sentiment_score'] == 0.8
+    assert result['model_name'] == 'openai'
+    sentiment_engine.openai_client.chat.completions.create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_analyze_openai_uses_cache(sentiment_engine):
+    """Test duplicate texts, concurrent or repeated, share one OpenAI call"""
+    mock_response = Mock()
+    mock_response.choices = [Mock()]
+    mock_response.choices[0].message.content = '{"sentiment_score": 0.8, "sentiment_label": "positive", "confidence_score": 0.9}'
+    sentiment_engine.openai_client = Mock()
+    sentiment_engine.openai_client.chat.completions.create = AsyncMock(return_value=mock_response)
+    
+    with patch('sentiment.sentiment_engine.get_cached', AsyncMock(return_value=None)), \
+         patch('sentiment.sentiment_engine.set_cached', AsyncMock()):
+        concurrent = await asyncio.gather(*(sentiment_engine.analyze_openai("Positive financial news") for _ in range(3)))
+        repeated = await sentiment_engine.analyze_openai("Positive financial news")
+    
+    assert [result['sentiment_score'] for result in concurrent] == [0.8, 0.8, 0.8]
+    assert repeated['sentiment_score'] == 0.8
+    assert sentiment_engine.openai_client.chat.completions.create.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_openai_batch_single_call(sentiment_engine):
+    """Test uncached texts share one OpenAI request and are cached per text"""
+    sentiment_engine.openai_client = Mock()
+    texts = [f"Company {i} beats estimates" for i in range(10)]
+    
+    reply = Mock()
+    reply.choices = [Mock()]
+    reply.choices[0].message.content = orjson.dumps({"results": [
+        {"sentiment_score": i / 10, "sentiment_label": "positive", "confidence_score": 0.9} for i in range(10)
+    ]}).decode()
+    sentiment_engine.openai_client.chat.completions.create = AsyncMock(return_value=reply)
+    
+    with patch('sentiment.sentiment_engine.get_cached', AsyncMock(return_value=None)), \
+         patch('sentiment.sentiment_engine.set_cached', AsyncMock()) as mock_set_cached:
+        results = await sentiment_engine.analyze_openai_batch(texts)
+        repeated = await sentiment_engine.analyze_openai_batch(texts[:3])
+    
+    assert sentiment_engine.openai_client.chat.completions.create.call_count == 1
+    assert [result['sentiment_score'] for result in results] == [i / 10 for i in range(10)]
+    assert all(result['model_name'] == 'openai' for result in results)
+    assert mock_set_cached.await_count == 10
+    assert repeated == results[:3]
+
+
+@pytest.mark.asyncio
+async def test_analyze_openai_batch_falls_back_on_mismatch(sentiment_engine):
+    """Test a batched reply with the wrong number of entries is retried one text at a time"""
+    sentiment_engine.openai_client = Mock()
+    reply = Mock()
+    reply.choices = [Mock()]
+    reply.choices[0].message.content = '{"results": [{"sentiment_score": 0.5, "sentiment_label": "positive", "confidence_score": 0.9}]}'
+    sentiment_engine.openai_client.chat.completions.create = AsyncMock(return_value=reply)
+    single = {'sentiment_score': 0.2, 'sentiment_label': 'neutral', 'confidence_score': 0.6}
+    
+    with patch('sentiment.sentiment_engine.get_cached', AsyncMock(return_value=None)), \
+         patch.object(sentiment_engine, 'analyze_openai', AsyncMock(return_value=single)) as mock_openai:
+        results = await sentiment_engine.analyze_openai_batch(["First text", "Second text"])
+    
+    assert results == [single, single]
+    assert mock_openai.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_analyze_openai_batch_failure_counts_toward_breaker(sentiment_engine):
+    """Test a failed batch request trips the breaker and isn't re-sent once per text"""
+    sentiment_engine.openai_client = Mock()
+    sentiment_engine.openai_client.chat.completions.create = AsyncMock(side_effect=Exception("API down"))
+    
+    with patch('sentiment.sentiment_engine.get_cached', AsyncMock(return_value=None)), \
+         patch('sentiment.sentiment_engine.settings.OPENAI_BREAKER_THRESHOLD', 1):
+        results = await sentiment_engine.analyze_openai_batch(["First text", "Second text", "Third text"])
+    
+    assert results == [None, None, None]
+    assert sentiment_engine.openai_client.chat.completions.create.await_count == 1
+    assert sentiment_engine._openai_open_until > 0
+
+
+@pytest.mark.asyncio
+async def test_analyze_openai_batch_retries_invalid_entries(sentiment_engine):
+    """Test a batched entry with non-numeric scores is retried alone while valid entries are kept"""
+    sentiment_engine.openai_client = Mock()
+    reply = Mock()
+    reply.choices = [Mock()]
+    reply.choices[0].message.content = orjson.dumps({"results": [
+        {"sentiment_score": "0.5", "sentiment_label": "positive", "confidence_score": 0.9},
+        {"sentiment_score": "high", "sentiment_label": "positive", "confidence_score": 0.9},
+    ]}).decode()
+    sentiment_engine.openai_client.chat.completions.create = AsyncMock(return_value=reply)
+    single = {'sentiment_score': 0.2, 'sentiment_label': 'neutral', 'confidence_score': 0.6}
+    
+    with patch('sentiment.sentiment_engine.get_cached', AsyncMock(return_value=None)), \
+         patch('sentiment.sentiment_engine.set_cached', AsyncMock()) as mock_set_cached, \
+         patch.object(sentiment_engine, 'analyze_openai', AsyncMock(return_value=single)) as mock_openai:
+        results = await sentiment_engine.analyze_openai_batch(["First text", "Second text"])
+    
+    assert results[0]['sentiment_score'] == 0.5
+    assert results[1] == single
+    mock_openai.assert_awaited_once_with("Second text")
+    assert mock_set_cached.await_count == 1
+
+
 @pytest.mark.asyncio
 async def test_analyze_ensemble(sentiment_engine):
     """Test ensemble sentiment analysis"""
@@ -101,7 +342,8 @@ async def test_analyze_ensemble(sentiment_engine):
         mock_finbert.return_value = {
             'sentiment_score': 0.5,
             'sentiment_label': 'positive',
-            'confidence_score': 0.8
+            'confidence_score': 0.8,
+            'embedding_vector': [0.1] * 768
         }
         
         mock_openai.return_value = {
@@ -117,6 +359,83 @@ async def test_analyze_ensemble(sentiment_engine):
         assert abs(result['sentiment_score'] - expected_score) < 0.01
         assert result['sentiment_label'] == 'positive'
         assert result['model_name'] == 'ensemble'
+        assert result['embedding_vector'] == [0.1] * 768
+
+
+@pytest.mark.asyncio
+async def test_analyze_ensemble_runs_in_parallel(sentiment_engine):
+    """Test the blocking FinBERT forward runs off the event loop, overlapping the OpenAI request"""
+    sentiment_engine._initialized = True
+    sentiment_engine.finbert_tokenizer = Mock()
+    sentiment_engine.finbert_model = Mock()
+    
+    def slow_forward(texts):
+        time.sleep(0.2)
+        return np.array([[0.1, 0.2, 0.7]], dtype=np.float32), np.zeros((1, 768), dtype=np.float32)
+    
+    async def slow_openai(text):
+        await asyncio.sleep(0.2)
+        return {'sentiment_score': 0.7, 'sentiment_label': 'positive', 'confidence_score': 0.9}
+    
+    with patch.object(sentiment_engine, '_finbert_forward', side_effect=slow_forward), \
+         patch.object(sentiment_engine, 'analyze_openai', side_effect=slow_openai):
+        start = time.perf_counter()
+        result = await sentiment_engine.analyze_ensemble("Test article")
+        elapsed = time.perf_counter() - start
+    
+    assert result['model_name'] == 'ensemble'
+    assert elapsed < 0.35
+
+
+@pytest.mark.asyncio
+async def test_analyze_ensemble_tokenizes_once(sentiment_engine):
+    """Test the ensemble tokenizes its text once, and only for FinBERT"""
+    sentiment_engine._initialized = True
+    sentiment_engine.finbert_tokenizer = Mock(return_value={"input_ids": [[101, 7, 8, 102]]})
+    sentiment_engine.finbert_model = Mock()
+
+    forward_output = (np.array([[0.1, 0.2, 0.7]], dtype=np.float32), np.zeros((1, 768), dtype=np.float32))
+    openai_result = {'sentiment_score': 0.7, 'sentiment_label': 'positive', 'confidence_score': 0.9}
+
+    with patch.object(sentiment_engine, '_forward_token_ids', return_value=forward_output) as mock_forward, \
+         patch.object(sentiment_engine, 'analyze_openai', AsyncMock(return_value=openai_result)) as mock_openai:
+        result = await sentiment_engine.analyze_ensemble("Stocks  rally\non earnings")
+
+    sentiment_engine.finbert_tokenizer.assert_called_once_with(
+        ["Stocks rally on earnings"], truncation=True, max_length=512
+    )
+    mock_forward.assert_called_once_with([(101, 7, 8, 102)])
+    mock_openai.assert_awaited_once_with("Stocks  rally\non earnings")
+    assert result['model_name'] == 'ensemble'
+
+
+def test_combine_ensemble_batch_vectorized_scores(sentiment_engine):
+    """Test batched ensemble math matches the scalar weighting and label thresholds"""
+    rng = np.random.default_rng(0)
+    finbert_scores = rng.uniform(-1, 1, 100).tolist()
+    openai_scores = rng.uniform(-1, 1, 100).tolist()
+    finbert_results = [{"sentiment_score": score, "confidence_score": 0.8} for score in finbert_scores]
+    openai_results = [{"sentiment_score": score, "confidence_score": 0.6} for score in openai_scores]
+    openai_results[3] = None  # OpenAI failed for this one
+    
+    results = sentiment_engine._combine_ensemble_batch(finbert_results, openai_results)
+    
+    assert results[3] is finbert_results[3]
+    for i, result in enumerate(results):
+        if i == 3:
+            continue
+        expected = finbert_scores[i] * 0.7 + openai_scores[i] * 0.3
+        assert abs(result["sentiment_score"] - expected) < 1e-9
+        assert abs(result["confidence_score"] - (0.8 * 0.7 + 0.6 * 0.3)) < 1e-9
+        assert result["model_name"] == "ensemble"
+    
+    boundary = sentiment_engine._combine_ensemble_batch(
+        [{"sentiment_score": score, "confidence_score": 1.0} for score in (0.5, 0.4, 0.15, -0.4, -0.5)],
+        [{"sentiment_score": score, "confidence_score": 1.0} for score in (0.5, 0.4, 0.15, -0.4, -0.5)]
+    )
+    assert [result["sentiment_label"] for result in boundary] == [
+        "strongly_positive", "positive", "neutral", "negative", "strongly_negative"
+    ]
 
 
 @pytest.mark.asyncio
@@ -126,17 +445,187 @@ async def test_analyze_batch(sentiment_engine):
     
     texts = ["Positive news", "Negative news", "Neutral news"]
     
-    with patch.object(sentiment_engine, 'analyze_ensemble') as mock_ensemble:
-        mock_ensemble.return_value = {
-            'sentiment_score': 0.5,
-            'sentiment_label': 'positive',
-            'confidence_score': 0.8
-        }
+    with patch.object(sentiment_engine, 'analyze_finbert_batch') as mock_finbert_batch, \
+         patch.object(sentiment_engine, 'analyze_openai_batch') as mock_openai_batch:
+        
+        mock_finbert_batch.return_value = [
+            {
+                'sentiment_score': 0.5,
+                'sentiment_label': 'positive',
+                'confidence_score': 0.8
+            }
+            for _ in texts
+        ]
+        
+        mock_openai_batch.return_value = [
+            {
+                'sentiment_score': 0.7,
+                'sentiment_label': 'positive',
+                'confidence_score': 0.9
+            }
+            for _ in texts
+        ]
         
         results = await sentiment_engine.analyze_batch(texts)
         
         assert len(results) == 3
         assert all(result['model_name'] == 'ensemble' for result in results)
+        mock_finbert_batch.assert_called_once_with(texts)
+        mock_openai_batch.assert_called_once_with(texts)
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_finbert_single_forward_pass(sentiment_engine):
+    """Test FinBERT batch analysis runs one batched call per chunk"""
+    sentiment_engine._initialized = True
+    texts = ["Positive news", "Negative news", "Neutral news"]
+    
+    with patch.object(sentiment_engine, 'analyze_finbert_batch') as mock_finbert_batch:
+        mock_finbert_batch.return_value = [{'model_name': 'finbert'} for _ in texts]
+        
+        results = await sentiment_engine.analyze_batch(texts, model="finbert")
+        
+        assert len(results) == 3
+        mock_finbert_batch.assert_called_once_with(texts)
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_finbert_groups_by_length(sentiment_engine):
+    """Test multi-chunk FinBERT batches are grouped by length and returned in input order"""
+    sentiment_engine._initialized = True
+    texts = ["A much longer headline here", "Short", "Another long headline text", "Tiny"]
+    
+    async def fake_batch(batch):
+        return [{"text": text} for text in batch]
+    
+    with patch('sentiment.sentiment_engine.settings.SENTIMENT_BATCH_SIZE', 2), \
+         patch.object(sentiment_engine, 'analyze_finbert_batch', side_effect=fake_batch) as mock_finbert_batch:
+        results = await sentiment_engine.analyze_batch(texts, model="finbert")
+    
+    assert [result["text"] for result in results] == texts
+    assert mock_finbert_batch.call_args_list[0].args[0] == ["Tiny", "Short"]
+
+
+@pytest.mark.asyncio
+async def test_analyze_stream_yields_incrementally(sentiment_engine):
+    """Test streamed results arrive in input order, each chunk before the next one is scored"""
+    sentiment_engine._initialized = True
+    texts = [f"Headline {i}" for i in range(5)]
+    scored_batches = []
+    
+    async def fake_batch(batch):
+        scored_batches.append(batch)
+        return [{"text": text} for text in batch]
+    
+    with patch('sentiment.sentiment_engine.settings.SENTIMENT_BATCH_SIZE', 2), \
+         patch.object(sentiment_engine, 'analyze_finbert_batch', side_effect=fake_batch):
+        stream = sentiment_engine.analyze_stream(iter(texts), model="finbert")
+        first = await stream.__anext__()
+        assert first == {"text": "Headline 0"}
+        assert scored_batches == [["Headline 0", "Headline 1"]]
+        
+        rest = [result async for result in stream]
+    
+    assert [result["text"] for result in [first, *rest]] == texts
+    assert len(scored_batches) == 3
+
+
+def test_token_ids_encodes_misses_in_one_call(sentiment_engine):
+    """Test uncached texts are tokenized in a single batched call and then served from the cache"""
+    sentiment_engine.finbert_tokenizer = Mock(return_value={"input_ids": [[101, 1, 102], [101, 2, 2, 102]]})
+    
+    first = sentiment_engine._token_ids(["Stocks rally", "Bonds slip lower", "Stocks rally"])
+    second = sentiment_engine._token_ids(["Bonds slip lower", "Stocks rally"])
+    
+    sentiment_engine.finbert_tokenizer.assert_called_once_with(
+        ["Stocks rally", "Bonds slip lower"], truncation=True, max_length=512
+    )
+    assert first == [(101, 1, 102), (101, 2, 2, 102), (101, 1, 102)]
+    assert second == [(101, 2, 2, 102), (101, 1, 102)]
+
+
+def test_token_ids_encodes_under_token_lock(sentiment_engine):
+    """Test the tokenizer is only called with the token lock held, since it can't be shared across threads"""
+    def encode(texts, **kwargs):
+        assert sentiment_engine._token_lock.locked()
+        return {"input_ids": [[101, 102] for _ in texts]}
+    
+    sentiment_engine.finbert_tokenizer = Mock(side_effect=encode)
+    
+    assert sentiment_engine._token_ids(["Stocks rally"]) == [(101, 102)]
+    sentiment_engine.finbert_tokenizer.assert_called_once()
+
+
+def test_finbert_forward_runs_in_inference_mode(sentiment_engine):
+    """Test the forward pass runs under torch.inference_mode and splits the packed output"""
+    sentiment_engine.finbert_tokenizer = Mock()
+    sentiment_engine.finbert_tokenizer.pad.return_value = {"input_ids": torch.ones(1, 3, dtype=torch.long)}
+    sentiment_engine.finbert_model = Mock()
+    
+    with patch('sentiment.sentiment_engine.torch.inference_mode') as mock_inference_mode, \
+         patch.object(sentiment_engine, '_packed_forward', return_value=torch.zeros(1, 3 + 768)):
+        probabilities, embeddings = sentiment_engine._forward_token_ids([(101, 1, 102)])
+    
+    mock_inference_mode.return_value.__enter__.assert_called_once()
+    assert probabilities.shape == (1, 3)
+    assert embeddings.shape == (1, 768)
+
+
+@pytest.mark.parametrize("device, multiple", [("cuda", 8), ("cpu", None)])
+def test_forward_pads_to_multiple_of_8_on_gpu(sentiment_engine, device, multiple):
+    """Test padded batch lengths are rounded up to a multiple of 8 for tensor cores on GPU only"""
+    sentiment_engine.device = torch.device(device)
+    sentiment_engine.finbert_tokenizer = Mock()
+    sentiment_engine.finbert_tokenizer.pad.return_value = {"input_ids": torch.ones(3, 16, dtype=torch.long)}
+    sentiment_engine.finbert_model = Mock()
+    token_ids = [tuple(range(3)), tuple(range(5)), tuple(range(13))]
+    
+    with patch.object(sentiment_engine, '_to_device', side_effect=lambda inputs: dict(inputs)), \
+         patch.object(sentiment_engine, '_packed_forward', return_value=torch.zeros(3, 3 + 768)):
+        sentiment_engine._forward_token_ids(token_ids)
+    
+    assert sentiment_engine.finbert_tokenizer.pad.call_args.kwargs["pad_to_multiple_of"] == multiple
+
+
+def test_length_buckets(sentiment_engine):
+    """Test texts are grouped by sequence-length bucket, shortest bucket first"""
+    assert sentiment_engine._length_buckets([10, 500, 12, 490, 100]) == [[0, 2], [4], [1, 3]]
+    assert sentiment_engine._length_buckets([20, 30]) == [[0, 1]]
+
+
+@pytest.mark.asyncio
+async def test_analyze_finbert_batch_reuses_cached_results(sentiment_engine):
+    """Test repeated texts are scored from the result cache without another forward pass"""
+    sentiment_engine._initialized = True
+    sentiment_engine.finbert_tokenizer = Mock()
+    sentiment_engine.finbert_model = Mock()
+    
+    with patch.object(sentiment_engine, '_finbert_forward') as mock_forward:
+        mock_forward.return_value = (
+            np.array([[0.1, 0.2, 0.7]], dtype=np.float32),
+            np.zeros((1, 768), dtype=np.float32)
+        )
+        
+        first = await sentiment_engine.analyze_finbert_batch(["Apple beats estimates"])
+        second = await sentiment_engine.analyze_finbert_batch(["  Apple beats estimates  "])
+        
+        mock_forward.assert_called_once_with(["Apple beats estimates"])
+        assert second[0]["sentiment_score"] == first[0]["sentiment_score"]
+        assert second[0]["processing_time_ms"] == 0
+        assert second[0]["embedding_vector"].dtype == np.float32
+
+
+@pytest.mark.asyncio
+async def test_analyze_finbert_coalesces_concurrent_calls(sentiment_engine):
+    """Test concurrent single-text calls share one batched forward pass"""
+    async def fake_batch(texts):
+        return [{"sentiment_score": 0.0, "text": text} for text in texts]
+    
+    with patch.object(sentiment_engine, 'analyze_finbert_batch', side_effect=fake_batch) as mock_finbert_batch:
+        results = await asyncio.gather(*(sentiment_engine.analyze_finbert(f"Text {i}") for i in range(3)))
+    
+    assert [result["text"] for result in results] == ["Text 0", "Text 1", "Text 2"]
+    mock_finbert_batch.assert_called_once_with(["Text 0", "Text 1", "Text 2"])
 
 
 @pytest.mark.asyncio
@@ -152,6 +641,42 @@ async def test_analyze_finbert_error_handling(sentiment_engine):
         assert 'error' in result
 
 
+def test_score_batch(sentiment_engine):
+    """Test vectorized scoring matches the label thresholds"""
+    probabilities = np.array([
+        [0.05, 0.15, 0.80],  # strongly positive
+        [0.20, 0.60, 0.20],  # neutral
+        [0.35, 0.50, 0.15],  # negative
+        [0.70, 0.20, 0.10],  # strongly negative
+    ], dtype=np.float32)
+    
+    scores, labels, confidences = sentiment_engine._score_batch(probabilities)
+    
+    assert labels.tolist() == ["strongly_positive", "neutral", "negative", "strongly_negative"]
+    assert abs(scores[0] - 0.75) < 1e-6
+    assert abs(confidences[1] - 0.6) < 1e-6
+
+
+@pytest.mark.asyncio
+async def test_embed(sentiment_engine):
+    """Test query embedding returns the [CLS] hidden state"""
+    sentiment_engine._initialized = True
+    sentiment_engine.finbert_tokenizer = Mock(return_value={"input_ids": [[101, 5, 6, 102]]})
+    sentiment_engine.finbert_model = Mock()
+    sentiment_engine.finbert_model.base_model.return_value = Mock(last_hidden_state=torch.ones(1, 4, 768))
+    
+    result = await sentiment_engine.embed("Apple beats earnings estimates")
+    
+    assert len(result) == 768
+    assert result[0] == 1.0
+    
+    # A repeated query reuses the cached token ids
+    await sentiment_engine.embed("Apple beats earnings estimates")
+    sentiment_engine.finbert_tokenizer.assert_called_once()
+    input_ids = sentiment_engine.finbert_model.base_model.call_args.kwargs["input_ids"]
+    assert input_ids.tolist() == [[101, 5, 6, 102]]
+
+
 @pytest.mark.asyncio
 async def test_analyze_openai_no_client(sentiment_engine):
     """Test OpenAI analysis when client is not initialized"""
@@ -162,5 +687,21 @@ async def test_analyze_openai_no_client(sentiment_engine):
     assert result is None
 
 
+@pytest.mark.asyncio
+async def test_openai_circuit_breaker_opens_after_failures(sentiment_engine):
+    """Test consecutive OpenAI failures open the breaker and skip the API during the cooldown"""
+    sentiment_engine.openai_client = Mock()
+    sentiment_engine.openai_client.chat.completions.create = AsyncMock(side_effect=Exception("API down"))
+    
+    with patch('sentiment.sentiment_engine.get_cached', AsyncMock(return_value=None)), \
+         patch('sentiment.sentiment_engine.settings.OPENAI_BREAKER_THRESHOLD', 5):
+        for i in range(5):
+            assert await sentiment_engine.analyze_openai(f"Failing text {i}") is None
+        
+        assert await sentiment_engine.analyze_openai("Another text") is None
+    
+    assert sentiment_engine.openai_client.chat.completions.create.await_count == 5
+
+
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
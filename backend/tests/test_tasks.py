@@ -0,0 +1,25 @@
+from unittest.mock import Mock, patch
+import tasks
+
+
+def test_score_texts_skips_caching_finbert_fallbacks():
+    """Test results that fell back to FinBERT alone aren't cached under the ensemble key"""
+    redis_client = Mock()
+    redis_client.mget.return_value = [None, None]
+    pipe = redis_client.pipeline.return_value
+    scored = [
+        {"sentiment_score": 0.4, "model_name": "ensemble"},
+        {"sentiment_score": 0.1, "model_name": "finbert"},
+    ]
+
+    with patch('tasks.celery_app') as mock_celery, \
+         patch('tasks.settings.OPENAI_API_KEY', 'test-key'), \
+         patch('tasks.run_async', return_value=scored), \
+         patch('sentiment.sentiment_engine.sentiment_engine.analyze_batch', Mock()):
+        mock_celery.backend.client = redis_client
+        results = tasks.score_texts(["Ensemble text", "Fallback text"])
+        ensemble_key = tasks._sentiment_cache_key("Ensemble text")
+
+    assert results == scored
+    pipe.setex.assert_called_once()
+    assert pipe.setex.call_args[0][0] == ensemble_key
@@ -1,6 +1,7 @@
 -- Enable required extensions
 CREATE EXTENSION IF NOT EXISTS vector;
 CREATE EXTENSION IF NOT EXISTS timescaledb;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Create database user if not exists
 DO $$
@@ -47,6 +48,9 @@ CREATE TABLE IF NOT EXISTS news_articles (
     is_processed BOOLEAN DEFAULT FALSE,
     is_archived BOOLEAN DEFAULT FALSE,
     raw_data JSONB,
+    tsv tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))
+    ) STORED,
     PRIMARY KEY (id, published_at)
 );
 
@@ -87,8 +91,15 @@ CREATE INDEX IF NOT EXISTS idx_news_articles_published_ticker ON news_articles(p
 CREATE INDEX IF NOT EXISTS idx_news_articles_sentiment_published ON news_articles(sentiment_score, published_at);
 CREATE INDEX IF NOT EXISTS idx_news_articles_url ON news_articles(url);
 CREATE INDEX IF NOT EXISTS idx_news_articles_title ON news_articles(title);
+CREATE INDEX IF NOT EXISTS idx_news_tsv ON news_articles USING GIN (tsv);
+CREATE INDEX IF NOT EXISTS idx_news_title_trgm ON news_articles USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_news_ticker_published_at ON news_articles(ticker_symbol, published_at DESC) INCLUDE (sentiment_score);
+CREATE INDEX IF NOT EXISTS idx_news_processed_published_at ON news_articles(published_at DESC) WHERE is_processed;
+CREATE INDEX IF NOT EXISTS idx_news_unarchived_published_at ON news_articles(published_at) WHERE is_archived = FALSE;
+CREATE INDEX IF NOT EXISTS idx_news_binary_sentiment ON news_articles(id) WHERE sentiment_score IN (-0.5, 0.5);
 CREATE INDEX IF NOT EXISTS idx_sentiment_analyses_article_model ON sentiment_analyses(article_id, model_name);
 CREATE INDEX IF NOT EXISTS idx_market_impacts_ticker_time ON market_impacts(ticker_symbol, measurement_time);
 
 -- Convert to TimescaleDB hypertable for time-series data
-SELECT create_hypertable('news_articles', 'published_at', if_not_exists => TRUE); 
\ No newline at end of file
+-- Daily chunks: the 24-hour listing/trend windows touch at most two chunks
+SELECT create_hypertable('news_articles', 'published_at', chunk_time_interval => INTERVAL '1 day', if_not_exists => TRUE); 
\ No newline at end of file